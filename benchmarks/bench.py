@@ -0,0 +1,277 @@
+"""
+Benchmarks the keyword query pipeline against a generated JetBrains configs tree.
+
+Usage: python -m benchmarks.bench [--entries N] [--save-baseline FILE] [--baseline FILE]
+"""
+from __future__ import annotations
+
+import argparse
+import builtins
+import json
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, List
+
+SCENARIOS = ["cold", "empty", "ide_scoped", "global", "keystrokes"]
+KEYSTROKES = "payments api"
+COUNTED_FUNCTIONS = ["stat", "lstat", "listdir", "scandir"]
+
+
+class FsCallCounter:
+    """ Counts filesystem calls made through the os module and open() """
+
+    count: int
+    _originals: Dict[str, Callable]
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.count = 0
+        self._originals = {}
+
+    def __enter__(self) -> FsCallCounter:
+        for name in COUNTED_FUNCTIONS:
+            self._originals[name] = getattr(os, name)
+            setattr(os, name, self._wrap(getattr(os, name)))
+
+        self._originals["open"] = builtins.open
+        builtins.open = self._wrap(builtins.open)
+        return self
+
+    def __exit__(self, *_) -> None:
+        for name, function in self._originals.items():
+            setattr(builtins if name == "open" else os, name, function)
+
+    def _wrap(self, function: Callable) -> Callable:
+        def counted(*args, **kwargs):
+            self.count += 1
+            return function(*args, **kwargs)
+
+        return counted
+
+
+def clear_caches() -> None:
+    """
+    Clears process wide caches, so the next extension instance starts cold
+    """
+
+    # pylint: disable=import-outside-toplevel
+    from utils.ProjectMetadata import ProjectMetadata
+    from utils.RecentProjectsParser import RecentProjectsParser
+
+    RecentProjectsParser.clear_cache()
+    ProjectMetadata.clear_cache()
+
+
+def create_extension(env, options: Dict[str, str] | None = None) -> Any:
+    """
+    Creates the extension and sends it the initial preferences
+    :param env: Fake environment
+    :param options: Preferences overriding the defaults
+    :return: Extension instance
+    """
+
+    # pylint: disable=import-outside-toplevel
+    from events.PreferencesEventListener import PreferencesEventListener
+    from main import JetbrainsLauncherExtension
+
+    extension = JetbrainsLauncherExtension()
+    PreferencesEventListener().on_event(SimpleNamespace(preferences={
+        "configs_path": env.configs_path,
+        "studio_config_path": env.studio_config_path,
+        "scripts_path": env.scripts_path,
+        "custom_aliases": "py: pycharm;",
+        "sort_by": "none",
+        **(options or {})
+    }), extension)
+
+    # Queries run during the warm-up get partial results, wait for complete ones
+    extension.index.wait(extension.index.warming())
+    return extension
+
+
+def run_query(extension, query: str) -> Any:
+    """
+    Sends the keyword query to the extension
+    :param extension: Extension instance
+    :param query: Query argument
+    :return: Rendered action
+    """
+
+    # pylint: disable=import-outside-toplevel
+    from events.KeywordQueryEventListener import KeywordQueryEventListener
+
+    listener = getattr(extension, "_benchmark_listener", None)
+    if listener is None:
+        listener = KeywordQueryEventListener()
+        setattr(extension, "_benchmark_listener", listener)
+
+    return listener.render(SimpleNamespace(get_argument=lambda: query), extension)
+
+
+def measure(action: Callable[[], Any], repeat: int) -> Dict[str, float]:
+    """
+    Measures latency, filesystem calls, peak memory of the action and memory it kept allocated,
+    e.g. in caches and indexes
+    :param action: Action to measure
+    :param repeat: Number of repetitions
+    :return: Measured values
+    """
+
+    timings: List[float] = []
+    calls = 0
+
+    tracemalloc.start()
+    for _ in range(repeat):
+        with FsCallCounter() as counter:
+            start = time.perf_counter()
+            action()
+            timings.append((time.perf_counter() - start) * 1000)
+        calls += counter.count
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    timings.sort()
+    return {
+        "p50_ms": round(statistics.median(timings), 3),
+        "p95_ms": round(timings[min(len(timings) - 1, int(len(timings) * 0.95))], 3),
+        "fs_calls": round(calls / repeat, 1),
+        "peak_kib": round(peak / 1024, 1),
+        "retained_kib": round(retained / 1024, 1)
+    }
+
+
+def run_scenarios(env, repeat: int, options: Dict[str, str]) -> Dict[str, Dict[str, float]]:
+    """
+    Runs all benchmark scenarios
+    :param env: Fake environment
+    :param repeat: Number of repetitions of each scenario
+    :param options: Preferences overriding the defaults
+    :return: Measured values for each scenario
+    """
+
+    results: Dict[str, Dict[str, float]] = {}
+
+    def cold():
+        clear_caches()
+        extension = create_extension(env, options)
+        run_query(extension, "")
+        extension.watcher.stop()
+
+    results["cold"] = measure(cold, max(1, repeat // 10))
+
+    extension = create_extension(env, options)
+    run_query(extension, "")
+
+    results["empty"] = measure(lambda: run_query(extension, ""), repeat)
+    results["ide_scoped"] = measure(lambda: run_query(extension, "pycharm backend"), repeat)
+    results["global"] = measure(lambda: run_query(extension, "payments api"), repeat)
+
+    def keystrokes():
+        for index in range(1, len(KEYSTROKES) + 1):
+            run_query(extension, KEYSTROKES[:index])
+
+    results["keystrokes"] = measure(keystrokes, max(1, repeat // 5))
+    extension.watcher.stop()
+
+    return results
+
+
+def compare(results: Dict[str, Dict[str, float]], baseline: Dict[str, Dict[str, float]],
+            tolerance: float) -> List[str]:
+    """
+    Compares results with the baseline
+    :param results: Measured values
+    :param baseline: Baseline values
+    :param tolerance: Allowed ratio between the measured and baseline values
+    :return: Descriptions of regressions
+    """
+
+    regressions = []
+    for scenario, values in baseline.items():
+        for metric in ("p95_ms", "fs_calls", "peak_kib", "retained_kib"):
+            if scenario not in results or metric not in values:
+                continue
+
+            # Small absolute differences are noise, whatever the ratio is
+            limit = max(values[metric] * tolerance, values[metric] + 1)
+            if results[scenario][metric] > limit:
+                regressions.append(
+                    f"{scenario}.{metric}: {results[scenario][metric]} > "
+                    f"{values[metric]} * {tolerance}"
+                )
+
+    return regressions
+
+
+def main() -> int:
+    """
+    Runs the benchmark
+    :return: Exit code
+    """
+
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--entries", type=int, default=200, help="recent projects per file")
+    parser.add_argument("--versions", type=int, default=6, help="config directories per IDE")
+    parser.add_argument("--groups", type=int, default=3, help="project groups per file")
+    parser.add_argument("--repeat", type=int, default=50, help="repetitions of each scenario")
+    parser.add_argument("--discovery", choices=["scripts", "toolbox"], default="scripts",
+                        help="installed IDEs discovery preference")
+    parser.add_argument("--history", choices=["newest", "all"], default="newest",
+                        help="recent projects history preference")
+    parser.add_argument("--baseline", help="fail if results regress against this file")
+    parser.add_argument("--save-baseline", help="save results to this file")
+    parser.add_argument("--tolerance", type=float, default=1.5,
+                        help="allowed ratio between results and the baseline")
+    args = parser.parse_args()
+
+    root = tempfile.mkdtemp(prefix="jetbrains-bench-")
+    os.environ["HOME"] = root
+    os.environ["XDG_CACHE_HOME"] = os.path.join(root, ".cache")
+    os.environ["XDG_DATA_HOME"] = os.path.join(root, ".local", "share")
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+    try:
+        # pylint: disable=import-outside-toplevel
+        from benchmarks.fixtures import FakeEnvironment
+        from main import JetbrainsLauncherExtension
+
+        env = FakeEnvironment(root, JetbrainsLauncherExtension.ides, versions=args.versions,
+                              entries=args.entries, groups=args.groups)
+        results = run_scenarios(env, args.repeat, {
+            "ide_discovery": args.discovery,
+            "merge_history": args.history
+        })
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+    print(f"{'scenario':<12}{'p50 ms':>10}{'p95 ms':>10}{'fs calls':>10}{'peak KiB':>12}"
+          f"{'kept KiB':>12}")
+    for scenario in SCENARIOS:
+        values = results[scenario]
+        print(f"{scenario:<12}{values['p50_ms']:>10}{values['p95_ms']:>10}"
+              f"{values['fs_calls']:>10}{values['peak_kib']:>12}{values['retained_kib']:>12}")
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w", encoding="utf8") as file:
+            json.dump(results, file, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf8") as file:
+            regressions = compare(results, json.load(file), args.tolerance)
+
+        for regression in regressions:
+            print(f"REGRESSION {regression}", file=sys.stderr)
+
+        return 1 if regressions else 0
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,156 @@
+""" Contains generator of fake JetBrains configs used by the benchmarks """
+from __future__ import annotations
+
+import json
+import os
+import random
+from typing import Dict, List
+from xml.sax.saxutils import quoteattr
+
+from data.IdeData import IdeData
+from data.IdeKey import IdeKey
+
+WORDS = [
+    "api", "backend", "billing", "client", "core", "dashboard", "docs", "frontend", "gateway",
+    "infra", "legacy", "mobile", "monitoring", "payments", "platform", "search", "service",
+    "shared", "storage", "tools", "ui", "web", "worker"
+]
+
+
+TOOLBOX_PRODUCT_CODES = {
+    "clion": "CL", "idea": "IU", "phpstorm": "PS", "pycharm": "PC", "rider": "RD", "webstorm": "WS",
+    "goland": "GO", "datagrip": "DG", "rubymine": "RM", "android-studio": "AI", "rustrover": "RR"
+}
+
+
+# pylint: disable=too-few-public-methods
+class FakeEnvironment:
+    """ Fake home directory with JetBrains configs, launcher scripts, Toolbox state and projects """
+
+    home: str
+    configs_path: str
+    studio_config_path: str
+    scripts_path: str
+    toolbox_state_path: str
+    projects: List[str]
+
+    # pylint: disable=too-many-arguments,too-many-positional-arguments,too-many-locals
+    def __init__(self, root: str, ides: Dict[IdeKey, IdeData], versions: int = 6,
+                 entries: int = 200, groups: int = 3, seed: int = 0) -> None:
+        """
+        Generates the environment
+        :param root: Directory to generate the environment in, used as the home directory
+        :param ides: IDEs to generate configs and launcher scripts for
+        :param versions: Number of versioned config directories for each config prefix
+        :param entries: Number of recent projects entries in each recent projects file
+        :param groups: Number of project groups in each recent projects file
+        :param seed: Seed of the random generator
+        """
+
+        super().__init__()
+        self.home = root
+        self.configs_path = os.path.join(root, ".config", "JetBrains")
+        self.studio_config_path = os.path.join(root, ".config", "Google")
+        self.scripts_path = os.path.join(root, ".local", "bin")
+        self.toolbox_state_path = os.path.join(root, ".local", "share", "JetBrains", "Toolbox",
+                                               "state.json")
+        self.projects = []
+
+        generator = random.Random(seed)
+        self._make_projects(generator, entries * 2)
+        os.makedirs(self.scripts_path, exist_ok=True)
+
+        for ide_data in ides.values():
+            base_path = self.studio_config_path \
+                if ide_data.custom_config_key == "studio_config_path" else self.configs_path
+
+            for prefix in ide_data.config_prefixes:
+                for version in range(versions):
+                    directory = f"{prefix}20{18 + version}.{version % 3 + 1}"
+                    options = os.path.join(base_path, directory, "options")
+                    os.makedirs(options, exist_ok=True)
+
+                    with open(os.path.join(options, ide_data.recent_projects_file), "w",
+                              encoding="utf8") as file:
+                        file.write(self._make_recent_projects(generator, entries, groups))
+
+            script = os.path.join(self.scripts_path, ide_data.launcher_prefixes[0])
+            with open(script, "w", encoding="utf8") as file:
+                file.write("#!/bin/sh\n")
+            os.chmod(script, 0o755)
+
+        self._make_toolbox_state(ides)
+
+    def _make_toolbox_state(self, ides: Dict[IdeKey, IdeData]) -> None:
+        apps_path = os.path.join(os.path.dirname(self.toolbox_state_path), "apps")
+        tools = []
+
+        for ide_key, ide_data in ides.items():
+            product_code = TOOLBOX_PRODUCT_CODES[ide_key]
+            install_location = os.path.join(apps_path, product_code, "ch-0", "233.11799.241")
+            launch_command = os.path.join("bin", f"{ide_data.launcher_prefixes[0]}.sh")
+
+            os.makedirs(os.path.join(install_location, "bin"), exist_ok=True)
+            with open(os.path.join(install_location, launch_command), "w", encoding="utf8") as file:
+                file.write("#!/bin/sh\n")
+
+            tools.append({
+                "toolId": product_code,
+                "productCode": product_code,
+                "tag": "IDE",
+                "displayName": ide_data.name,
+                "displayVersion": "2023.3.2",
+                "buildNumber": "233.11799.241",
+                "installLocation": install_location,
+                "launchCommand": launch_command
+            })
+
+        with open(self.toolbox_state_path, "w", encoding="utf8") as file:
+            json.dump({"version": 1, "tools": tools}, file)
+
+    def _make_projects(self, generator: random.Random, count: int) -> None:
+        for index in range(count):
+            name = "-".join(generator.sample(WORDS, 2)) + f"-{index}"
+            path = os.path.join(self.home, "Projects", generator.choice(WORDS), name)
+            idea = os.path.join(path, ".idea")
+            os.makedirs(idea, exist_ok=True)
+
+            if index % 4 == 0:
+                with open(os.path.join(idea, ".name"), "w", encoding="utf8") as file:
+                    file.write(f"{name.title()}\n")
+
+            if index % 5 == 0:
+                with open(os.path.join(idea, "icon.svg"), "w", encoding="utf8") as file:
+                    file.write("<svg/>")
+
+            self.projects.append(path.replace(self.home, "$USER_HOME$", 1))
+
+    def _make_recent_projects(self, generator: random.Random, entries: int, groups: int) -> str:
+        paths = generator.sample(self.projects, entries)
+        additional_info = "".join(
+            f"<entry key={quoteattr(path)}><value><RecentProjectMetaInfo>"
+            '<option name="projectOpenTimestamp" '
+            f'value="{generator.randint(10 ** 12, 2 * 10 ** 12)}" />'
+            "</RecentProjectMetaInfo></value></entry>"
+            for path in paths
+        )
+        recent_paths = "".join(
+            f"<option value={quoteattr(path)} />" for path in paths[:entries // 4]
+        )
+        project_groups = "".join(
+            '<ProjectGroup><option name="projects"><list>' +
+            "".join(
+                f"<option value={quoteattr(path)} />"
+                for path in generator.sample(paths, min(5, len(paths)))
+            ) +
+            "</list></option></ProjectGroup>"
+            for _ in range(groups)
+        )
+
+        return (
+            '<application><component name="RecentProjectsManager">'
+            f'<option name="additionalInfo"><map>{additional_info}</map></option>'
+            f'<option name="recentPaths"><list>{recent_paths}</list></option>'
+            f'<option name="groups"><list>{project_groups}</list></option>'
+            "</component></application>"
+        )
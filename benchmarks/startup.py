@@ -0,0 +1,124 @@
+"""
+Measures how long importing the extension takes and checks it against the startup budget.
+
+Usage: python -m benchmarks.startup [--budget-ms MS] [--repeat N] [--top N]
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import re
+import subprocess
+import sys
+from typing import List, Tuple
+
+BUDGET_MS = 150.0
+# Modules needed only to compare versions, score or render results must not be imported on startup
+LAZY_MODULES = [
+    "semver",
+    "ulauncher.utils.fuzzy_search",
+    "ulauncher.api.shared.item.ExtensionResultItem",
+    "ulauncher.api.shared.action.RunScriptAction",
+    "ulauncher.api.shared.action.CopyToClipboardAction",
+    "ulauncher.api.shared.action.HideWindowAction",
+    "ulauncher.api.shared.action.ExtensionCustomAction",
+    "utils.FuzzyScorer",
+    "utils.PathIndex",
+    "utils.ProjectsList",
+    "utils.SearchIndex"
+]
+IMPORT_TIME_LINE = re.compile(r"^import time:\s*(\d+)\s*\|\s*(\d+)\s*\|(\s*)(\S+)\s*$")
+
+ImportTime = Tuple[str, int, int, int]
+
+
+def parse_import_times(output: str) -> List[ImportTime]:
+    """
+    Parses output of `python -X importtime`
+    :param output: Standard error of the interpreter
+    :return: Module name, self and cumulative time in microseconds and nesting level of each import
+    """
+
+    imports = []
+    for line in output.splitlines():
+        match = IMPORT_TIME_LINE.match(line)
+        if match is None:
+            continue
+
+        self_us, cumulative_us, indent, module = match.groups()
+        imports.append((module, int(self_us), int(cumulative_us), (len(indent) - 1) // 2))
+
+    return imports
+
+
+def measure_import(module: str) -> List[ImportTime]:
+    """
+    Imports the module in a fresh interpreter with import times enabled
+    :param module: Module to import
+    :return: Parsed import times
+    """
+
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=root, capture_output=True, text=True, check=False
+    )
+    if process.returncode != 0:
+        raise RuntimeError(f"Importing {module} failed:\n{process.stderr}")
+
+    return parse_import_times(process.stderr)
+
+
+def get_total_us(imports: List[ImportTime], module: str) -> int:
+    """
+    Gets cumulative import time of the module
+    :param imports: Parsed import times
+    :param module: Module name
+    :return: Time in microseconds
+    """
+
+    return next((cumulative for name, _, cumulative, _ in imports if name == module), 0)
+
+
+def main() -> int:
+    """
+    Runs the measurement
+    :return: Exit code
+    """
+
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--module", default="main", help="module to import")
+    parser.add_argument("--budget-ms", type=float, default=BUDGET_MS, help="allowed import time")
+    parser.add_argument("--repeat", type=int, default=5,
+                        help="number of imports, the fastest one is compared with the budget")
+    parser.add_argument("--top", type=int, default=10,
+                        help="print N modules with the highest self time")
+    args = parser.parse_args()
+
+    runs = [measure_import(args.module) for _ in range(args.repeat)]
+    imports = min(runs, key=lambda run: get_total_us(run, args.module))
+    total_ms = get_total_us(imports, args.module) / 1000
+
+    print(f"{'module':<60}{'self ms':>10}{'cumul ms':>10}")
+    for name, self_us, cumulative_us, _ in sorted(imports, key=lambda item: -item[1])[:args.top]:
+        print(f"{name[:59]:<60}{self_us / 1000:>10.2f}{cumulative_us / 1000:>10.2f}")
+    print(f"import {args.module}: {total_ms:.2f}ms (budget {args.budget_ms:.2f}ms)")
+
+    failed = False
+    eager = sorted({
+        name for name, *_ in imports
+        if any(name == module or name.startswith(module + ".") for module in LAZY_MODULES)
+    })
+    for name in eager:
+        print(f"EAGER IMPORT {name}", file=sys.stderr)
+        failed = True
+
+    if total_ms > args.budget_ms:
+        print(f"OVER BUDGET {total_ms:.2f}ms > {args.budget_ms:.2f}ms", file=sys.stderr)
+        failed = True
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,197 @@
+"""
+Runs the extension query pipeline from the command line, without a running Ulauncher.
+
+Usage: python cli.py [options] QUERY... or python cli.py [options] --replay FILE
+"""
+from __future__ import annotations
+
+import argparse
+import cProfile
+import json
+import logging
+import os
+import pstats
+import sys
+import tempfile
+from types import SimpleNamespace
+from typing import Any, Dict, Iterable, List
+
+from events.KeywordQueryEventListener import KeywordQueryEventListener
+from events.PreferencesEventListener import PreferencesEventListener
+from data.IdeKey import IdeKey
+from main import JetbrainsLauncherExtension
+from utils.ProjectIndex import ProjectIndex
+from utils.Timings import STAGES, Timings
+
+
+class OfflineExtension(JetbrainsLauncherExtension):
+    """
+    Extension queried from the command line. Projects are loaded in the querying thread,
+    so query timings and profiles include the loads, and the file watcher isn't started.
+    Without the warm-up, the first query of every IDE pays for its cold caches.
+    """
+
+    warm: bool
+
+    def __init__(self, warm: bool = False) -> None:
+        super().__init__()
+        self.warm = warm
+        self.index = ProjectIndex(self.get_recent_projects, max_workers=0)
+
+    def update_paths(self, ide_keys: Iterable[IdeKey] | None = None) -> None:
+        """
+        Drops indexed data, warming it up again only in the warm mode
+        :param ide_keys: Keys of IDEs affected by the changed paths, all IDEs when not specified
+        """
+
+        ide_keys = list(ide_keys) if ide_keys is not None else None
+
+        self.index.invalidate(ide_keys)
+        if self.warm:
+            self.warm_up(ide_keys)
+
+
+def get_default_preferences() -> Dict[str, Any]:
+    """
+    Reads default preferences from the extension manifest
+    :return: Default preferences
+    """
+
+    with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), "manifest.json"), "r",
+              encoding="utf8") as file:
+        manifest = json.load(file)
+
+    return {
+        preference["id"]: preference.get("default_value") for preference in manifest["preferences"]
+    }
+
+
+def parse_args(argv: List[str] | None = None) -> argparse.Namespace:
+    """
+    Parses command line arguments
+    :param argv: Arguments to parse
+    :return: Parsed arguments
+    """
+
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("queries", nargs="*", metavar="QUERY",
+                        help="query as typed after the keyword, e.g. \"pycharm api\"")
+    parser.add_argument("--replay", metavar="FILE",
+                        help="file with one query per line, lines starting with # are skipped")
+    parser.add_argument("--configs-path", help="configs location preference")
+    parser.add_argument("--studio-config-path", help="Android Studio config location preference")
+    parser.add_argument("--scripts-path", help="shell scripts location preference")
+    parser.add_argument("--aliases", help="custom aliases preference, e.g. \"py: pycharm;\"")
+    parser.add_argument("--sort-by", choices=["none", "recent", "ascending", "descending"],
+                        help="sort by preference")
+    parser.add_argument("--repeat", type=int, default=1, help="run every query this many times")
+    parser.add_argument("--warm", action="store_true",
+                        help="load projects before the first query, as the extension does on start")
+    parser.add_argument("--timings", action="store_true", help="print timings of every query stage")
+    parser.add_argument("--profile", metavar="FILE", help="dump cProfile stats to the file")
+    parser.add_argument("--profile-top", type=int, metavar="N",
+                        help="print N functions with the highest cumulative time")
+    parser.add_argument("--quiet", action="store_true", help="don't print the results")
+    parser.add_argument("--verbose", action="store_true", help="print extension logs")
+
+    args = parser.parse_args(argv)
+    if not args.queries and not args.replay:
+        parser.error("either QUERY or --replay is required")
+
+    return args
+
+
+def create_extension(args: argparse.Namespace) -> OfflineExtension:
+    """
+    Creates the extension with preferences taken from the manifest and command line arguments.
+    The snapshot of the installed extension is neither restored nor overwritten.
+    :param args: Parsed arguments
+    :return: Extension instance
+    """
+
+    preferences = get_default_preferences()
+    overrides = {
+        "configs_path": args.configs_path,
+        "studio_config_path": args.studio_config_path,
+        "scripts_path": args.scripts_path,
+        "custom_aliases": args.aliases,
+        "sort_by": args.sort_by
+    }
+    preferences.update({key: value for key, value in overrides.items() if value is not None})
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        os.environ["XDG_CACHE_HOME"] = cache_dir
+        extension = OfflineExtension(warm=args.warm)
+
+    PreferencesEventListener().on_event(SimpleNamespace(preferences=preferences), extension)
+    return extension
+
+
+def print_timings(rows: List[Dict[str, Any]]) -> None:
+    """
+    Prints timings of the queries as a table
+    :param rows: Query, total and stage durations in seconds for every query
+    """
+
+    print(f"{'query':<24}{'total':>9}" + "".join(f"{stage:>10}" for stage in STAGES))
+    for row in rows:
+        print(f"{row['query'][:23]:<24}{row['total'] * 1000:>9.2f}" + "".join(
+            f"{row['stages'].get(stage, 0) * 1000:>10.2f}" for stage in STAGES
+        ))
+
+
+def main(argv: List[str] | None = None) -> int:
+    """
+    Runs the queries
+    :param argv: Command line arguments
+    :return: Exit code
+    """
+
+    args = parse_args(argv)
+    logging.basicConfig(level=logging.DEBUG if args.verbose else logging.WARNING)
+
+    queries: List[str] = list(args.queries)
+    if args.replay:
+        with open(args.replay, "r", encoding="utf8") as file:
+            queries += [line.rstrip("\n") for line in file if not line.startswith("#")]
+
+    extension = create_extension(args)
+    listener = KeywordQueryEventListener()
+    profiler = cProfile.Profile() if args.profile or args.profile_top else None
+    rows: List[Dict[str, Any]] = []
+
+    for query in queries:
+        results = []
+        for _ in range(args.repeat):
+            timings = Timings()
+
+            if profiler is not None:
+                profiler.enable()
+            event = SimpleNamespace(get_argument=lambda q=query: q)
+            results = listener.get_results(event, extension, timings)
+            if profiler is not None:
+                profiler.disable()
+
+            rows.append({"query": query, "total": timings.total(), "stages": timings.stages()})
+
+        if not args.quiet:
+            print(f"> {query}")
+            for rank, item in enumerate(results, start=1):
+                print(f"{rank:>3}. {item.get_name()}  {item.get_description(query)}")
+
+    if args.timings:
+        print_timings(rows)
+
+    if profiler is not None:
+        if args.profile:
+            profiler.dump_stats(args.profile)
+
+        if args.profile_top:
+            stats = pstats.Stats(profiler, stream=sys.stdout)
+            stats.sort_stats("cumulative").print_stats(args.profile_top)
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,104 @@
+"""
+Queries recent projects from the local query service of the running extension.
+
+Usage: python client.py [options] [QUERY...]
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import socket
+import sys
+from typing import Any, Dict, List
+
+from utils.QueryService import QueryService
+
+
+def send_query(path: str, request: Dict[str, Any], timeout: float = 5.0) -> Dict[str, Any]:
+    """
+    Sends a single query to the service and waits for its response
+    :param path: Path to the service socket
+    :param request: Query with optional "query", "ide", "sort_by" and "limit" fields
+    :param timeout: Seconds to wait for the connection and the response
+    :return: Response of the service
+    """
+
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+        client.settimeout(timeout)
+        client.connect(path)
+        try:
+            client.sendall(json.dumps(request).encode("utf8") + b"\n")
+        except BrokenPipeError:
+            # The service refuses connections above its limit before reading the query
+            pass
+
+        with client.makefile("rb") as file:
+            line = file.readline()
+
+    if not line:
+        raise ConnectionError("Query service closed the connection")
+
+    return json.loads(line)
+
+
+def parse_args(argv: List[str] | None = None) -> argparse.Namespace:
+    """
+    Parses command line arguments
+    :param argv: Arguments to parse
+    :return: Parsed arguments
+    """
+
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("query", nargs="*", metavar="QUERY", help="search query")
+    parser.add_argument("--socket", default=os.environ.get("JETBRAINS_LAUNCHER_SOCKET") or
+                        QueryService.get_default_path(), help="path to the service socket")
+    parser.add_argument("--ide", help="IDE key or alias to search in")
+    parser.add_argument("--sort-by", choices=["none", "recent", "ascending", "descending"],
+                        help="sort mode, the extension preference is used when not set")
+    parser.add_argument("--limit", type=int, help="maximum number of results")
+    parser.add_argument("--json", action="store_true", help="print the raw response")
+
+    return parser.parse_args(argv)
+
+
+def main(argv: List[str] | None = None) -> int:
+    """
+    Runs the query and prints one tab separated "path, name, IDE" line for each project
+    :param argv: Command line arguments
+    :return: Exit code
+    """
+
+    args = parse_args(argv)
+    request: Dict[str, Any] = {"query": " ".join(args.query)}
+    for key, value in (("ide", args.ide), ("sort_by", args.sort_by), ("limit", args.limit)):
+        if value is not None:
+            request[key] = value
+
+    try:
+        response = send_query(args.socket, request)
+    except (OSError, ValueError) as error:
+        print(f"Unable to query {args.socket}: {error}", file=sys.stderr)
+        return 2
+
+    if args.json:
+        print(json.dumps(response))
+    else:
+        for project in response.get("results", []):
+            print(f"{project['path']}\t{project['name']}\t{project['ide']}")
+
+        for ide_key, message in response.get("errors", {}).items():
+            print(f"Unable to load {ide_key} projects: {message}", file=sys.stderr)
+
+        if response.get("loading"):
+            print("Still loading: " + ", ".join(response["loading"]), file=sys.stderr)
+
+    if "error" in response:
+        print(response["error"], file=sys.stderr)
+        return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
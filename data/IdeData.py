@@ -1,7 +1,8 @@
 """ Contains IdeData class """
 from __future__ import annotations
 
-from typing import List
+import re
+from typing import List, Pattern, Tuple
 
 
 # pylint: disable=too-few-public-methods
@@ -12,6 +13,7 @@ class IdeData:
     launcher_prefixes: List[str]
     custom_config_key: str | None
     recent_projects_file: str
+    config_pattern: Pattern[str]
 
     def __init__(self, name: str, config_prefixes: [str], launcher_prefixes: List[str],
                  custom_config_key: str | None = None, recent_projects_file: str = "recentProjects.xml") -> None:
@@ -21,3 +23,21 @@ class IdeData:
         self.launcher_prefixes = launcher_prefixes
         self.custom_config_key = custom_config_key
         self.recent_projects_file = recent_projects_file
+        self.config_pattern = re.compile(
+            "^(?:" + "|".join(re.escape(prefix) for prefix in config_prefixes) + ")" +
+            r"(?P<major>0|[1-9]\d*)(\.(?P<minor>0|[1-9]\d*)(\.(?P<patch>0|[1-9]\d*))?)?"
+        )
+
+    def get_config_version(self, directory: str) -> Tuple[int, int, int] | None:
+        """
+        Parses version of the IDE config directory
+        :param directory: Config directory name
+        :return: Major, minor and patch version or None if the directory doesn't belong to the IDE
+        """
+
+        match = self.config_pattern.match(directory)
+        if match is None:
+            return None
+
+        major, minor, patch = match.group("major", "minor", "patch")
+        return int(major), int(minor or 0), int(patch or 0)
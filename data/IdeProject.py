@@ -1,27 +1,39 @@
 """ Contains project type """
 from __future__ import annotations
 
+import sys
+from typing import Tuple, cast
+
 from data.IdeKey import IdeKey
+from data.ProjectStatus import ProjectStatus
 
 
 # pylint: disable=too-few-public-methods
 class IdeProject:
-    """ Dictionary describing project data """
+    """
+    Dictionary describing project data.
+    Projects are kept for the whole session and shared by all queries, so they use slots
+    and intern their strings, the same path opened by many IDEs or versions is stored once.
+    """
+    __slots__ = ("name", "ide", "path", "timestamp", "icon", "status", "alternatives")
+
     name: str
     ide: IdeKey
     path: str
     timestamp: int | None
     icon: str | None
-    score: int
+    status: ProjectStatus
+    alternatives: Tuple[Tuple[IdeKey, int | None], ...]
 
     # pylint: disable=too-many-arguments
     def __init__(self, name: str, ide: IdeKey, path: str,
                  timestamp: int | None, icon: str | None = None) -> None:
         super().__init__()
 
-        self.name = name
-        self.ide = ide
-        self.path = path
+        self.name = sys.intern(name)
+        self.ide = cast(IdeKey, sys.intern(ide))
+        self.path = sys.intern(path)
         self.timestamp = timestamp
         self.icon = icon
-        self.score = 0
+        self.status = "ok"
+        self.alternatives = ()
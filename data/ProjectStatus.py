@@ -0,0 +1,9 @@
+""" Contains ProjectStatus type """
+
+from typing import Literal
+
+ProjectStatus = Literal[
+    "ok",
+    "missing",
+    "unreachable"
+]
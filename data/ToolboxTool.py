@@ -0,0 +1,20 @@
+""" Contains ToolboxTool class """
+from __future__ import annotations
+
+from typing import Tuple
+
+from data.IdeKey import IdeKey
+
+
+# pylint: disable=too-few-public-methods
+class ToolboxTool:
+    """ Class describing IDE installed by the JetBrains Toolbox app """
+    ide_key: IdeKey
+    launcher: str
+    version: Tuple[int, ...]
+
+    def __init__(self, ide_key: IdeKey, launcher: str, version: Tuple[int, ...]) -> None:
+        super().__init__()
+        self.ide_key = ide_key
+        self.launcher = launcher
+        self.version = version
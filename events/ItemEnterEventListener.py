@@ -0,0 +1,58 @@
+""" Contains class for handling item enter events from Ulauncher"""
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+from ulauncher.api.client.EventListener import EventListener
+
+if TYPE_CHECKING:
+    from ulauncher.api.shared.action.RenderResultListAction import RenderResultListAction
+    from ulauncher.api.shared.event import ItemEnterEvent
+
+    from main import JetbrainsLauncherExtension
+
+
+# pylint: disable=too-few-public-methods
+class ItemEnterEventListener(EventListener):
+    """ Shows IDEs in which a project opened by multiple IDEs can be opened """
+
+    def on_event(self, event: ItemEnterEvent, extension: 'JetbrainsLauncherExtension') -> \
+            RenderResultListAction:
+        """
+        Handles the item enter event
+        :param event: Event data
+        :param extension: Extension class
+        :return: List of actions to render
+        """
+
+        # pylint: disable=import-outside-toplevel
+        from ulauncher.api.shared.action.CopyToClipboardAction import CopyToClipboardAction
+        from ulauncher.api.shared.action.RenderResultListAction import RenderResultListAction
+        from ulauncher.api.shared.action.RunScriptAction import RunScriptAction
+        from ulauncher.api.shared.item.ExtensionResultItem import ExtensionResultItem
+
+        data = event.get_data()
+        path = data["path"]
+        launchers = extension.get_ide_launchers()
+        results = []
+
+        for ide_key in data["ides"]:
+            launcher = launchers.get(ide_key)
+            if not launcher:
+                continue
+
+            results.append(ExtensionResultItem(
+                icon=extension.get_ide_icon(ide_key),
+                name=f"Open in {extension.ides[ide_key].name}",
+                description=path,
+                on_enter=RunScriptAction(extension.get_open_command(launcher, path))
+            ))
+
+        results.append(ExtensionResultItem(
+            icon=extension.get_base_icon(),
+            name="Copy path",
+            description=path,
+            on_enter=CopyToClipboardAction(path)
+        ))
+
+        return RenderResultListAction(results)
@@ -1,100 +1,477 @@
 """ Contains class for handling keyword events from Ulauncher"""
 from __future__ import annotations
 
-import os
 import re
-from typing import cast, List, TYPE_CHECKING
+import threading
+from collections import OrderedDict
+from typing import cast, Dict, List, Tuple, TYPE_CHECKING
 
 from ulauncher.api.client.EventListener import EventListener
-from ulauncher.api.shared.action.CopyToClipboardAction import CopyToClipboardAction
-from ulauncher.api.shared.action.HideWindowAction import HideWindowAction
-from ulauncher.api.shared.action.RenderResultListAction import RenderResultListAction
-from ulauncher.api.shared.action.RunScriptAction import RunScriptAction
-from ulauncher.api.shared.event import KeywordQueryEvent
-from ulauncher.api.shared.item.ExtensionResultItem import ExtensionResultItem
 
 from data.IdeKey import IdeKey
 from data.IdeProject import IdeProject
-from utils.ProjectsList import ProjectsList
+from utils.ProjectIndex import LoadTimeout
+from utils.ProjectMetadata import ProjectMetadata
+from utils.QueryRunner import QueryToken
+from utils.Timings import Timings
 
+# Rendering and scoring modules are imported on the first query, to keep the extension startup fast
 if TYPE_CHECKING:
+    from ulauncher.api.shared.action.RenderResultListAction import RenderResultListAction
+    from ulauncher.api.shared.event import KeywordQueryEvent
+    from ulauncher.api.shared.item.ExtensionResultItem import ExtensionResultItem
+
     from main import JetbrainsLauncherExtension
+    from utils.PathIndex import PathIndex
+    from utils.ProjectsList import ProjectsList
+    from utils.SearchIndex import SearchIndex
+
+LOAD_TIMEOUT = 2.0
+WARM_UP_TIMEOUT = 0.05
+RESULTS_LIMIT = 8
+RESULTS_CACHE_SIZE = 32
+STATUS_LABELS = {
+    "missing": "Not found",
+    "unreachable": "Unreachable"
+}
+
+
+class LauncherNotFound(Exception):
+    """ Raised when searching in an IDE whose launcher is not found """
 
 
 # pylint: disable=too-few-public-methods
 class KeywordQueryEventListener(EventListener):
     """ Handles users input and searches for results """
 
-    def on_event(self, event: KeywordQueryEvent, extension: 'JetbrainsLauncherExtension') -> \
-            RenderResultListAction:
+    _search_index: Tuple[Tuple, SearchIndex] | None
+    _path_index: Tuple[Tuple, PathIndex] | None
+    _results: "OrderedDict[Tuple, List[IdeProject]]"
+    _loading: List[IdeKey]
+    _items: Tuple[int, Dict[Tuple, ExtensionResultItem]]
+    _lock: threading.Lock
+
+    def __init__(self) -> None:
+        super().__init__()
+        self._search_index = None
+        self._path_index = None
+        self._results = OrderedDict()
+        self._loading = []
+        self._items = (-1, {})
+        self._lock = threading.Lock()
+
+    def on_event(self, event: KeywordQueryEvent, extension: 'JetbrainsLauncherExtension') -> None:
+        """
+        Handles the keyword event in the query worker, results are sent once the query finishes
+        unless a newer query supersedes it. Partial results sent while IDEs are still loading
+        are sent again once the missing IDEs are loaded.
+        :param event: Event data
+        :param extension: Extension class
+        """
+
+        def run(token: QueryToken) -> None:
+            action = self.render(event, extension, token)
+            token.check()
+            extension.send_response(event, action)
+
+            while len(self._loading) > 0:
+                while not extension.index.wait(self._loading, timeout=WARM_UP_TIMEOUT):
+                    token.check()
+
+                action = self.render(event, extension, token)
+                token.check()
+                extension.send_response(event, action)
+
+        extension.query_runner.submit(run)
+
+    def render(self, event: KeywordQueryEvent, extension: 'JetbrainsLauncherExtension',
+               token: QueryToken | None = None) -> RenderResultListAction:
         """
-        Handles the keyword event
+        Searches for projects matching the keyword event and renders them
         :param event: Event data
         :param extension: Extension class
+        :param token: Token of the query job, used to stop when the query is superseded
         :return: List of actions to render
         """
 
-        args = [arg.lower() for arg in re.split("[ /]+", (event.get_argument() or ""))]
-        keyword = args[0] if len(args) > 0 else ""
-        ide_key: IdeKey | None = None
+        # pylint: disable=import-outside-toplevel
+        from ulauncher.api.shared.action.CopyToClipboardAction import CopyToClipboardAction
+        from ulauncher.api.shared.action.RenderResultListAction import RenderResultListAction
+        from ulauncher.api.shared.item.ExtensionResultItem import ExtensionResultItem
 
-        if extension.check_ide_key(keyword):
-            ide_key = cast(IdeKey, keyword)
-        elif keyword in extension.aliases:
-            ide_key = extension.aliases.get(keyword)
+        timings_mode = extension.get_timings_mode()
+        timings = Timings(enabled=timings_mode != "off")
 
-        query = " ".join(args[1:] if ide_key is not None else args).strip()
-        projects = ProjectsList(query, min_score=(60 if len(query) > 0 else 0), limit=8)
+        results = self.get_results(event, extension, timings, token)
+
+        if timings.enabled:
+            summary = timings.summary()
+            extension.logger.info("Query %r timings: %s", event.get_argument() or "", summary)
+
+            if timings_mode == "item":
+                stages, ides = timings.breakdown()
+                results.append(ExtensionResultItem(
+                    icon=extension.get_base_icon(),
+                    name=f"Query took {timings.total() * 1000:.2f}ms",
+                    description=f"{stages}\n{ides}" if ides else stages,
+                    on_enter=CopyToClipboardAction(summary)
+                ))
+
+        return RenderResultListAction(results)
+
+    # pylint: disable=too-many-locals
+    def get_results(self, event: KeywordQueryEvent, extension: 'JetbrainsLauncherExtension',
+                    timings: Timings, token: QueryToken | None = None) -> List[ExtensionResultItem]:
+        """
+        Searches for projects matching the keyword event.
+        IDEs still loading are skipped and listed in a loading item.
+        :param event: Event data
+        :param extension: Extension class
+        :param timings: Timings of the query stages
+        :param token: Token of the query job, used to stop when the query is superseded
+        :return: List of items to render
+        """
+
+        self._loading = []
+
+        with timings.measure("args"):
+            args = [arg.lower() for arg in re.split("[ /]+", (event.get_argument() or ""))]
+            keyword = args[0] if len(args) > 0 else ""
+            ide_key: IdeKey | None = None
+
+            if extension.check_ide_key(keyword):
+                ide_key = cast(IdeKey, keyword)
+            elif keyword in extension.aliases:
+                ide_key = extension.aliases.get(keyword)
+
+            query = " ".join(args[1:] if ide_key is not None else args).strip()
 
         try:
-            if ide_key is not None:
-                if not extension.get_ide_launcher_script(ide_key):
-                    return self.make_error(
-                        extension=extension,
-                        title="IDE launcher not found",
-                        desc="Please verify that you have the IDE installed.",
-                        ide_key=ide_key
-                    )
-
-                projects.extend(extension.get_recent_projects(ide_key))
-            else:
-                for key in [key for key in extension.ides if
-                            extension.get_ide_launcher_script(key)]:
-                    projects.extend(extension.get_recent_projects(cast(IdeKey, key)))
+            sorted_projects, errors, self._loading = self.search(
+                extension, ide_key, query, extension.preferences.get("sort_by") or "none",
+                RESULTS_LIMIT, timings, token
+            )
+        except LauncherNotFound:
+            return [self.make_error_item(
+                extension=extension,
+                title="IDE launcher not found",
+                desc="Please verify that you have the IDE installed.",
+                ide_key=ide_key
+            )]
         except FileNotFoundError:
-            return self.make_error(
+            return [self.make_error_item(
                 extension=extension,
                 title="Unable to find IDE configuration",
                 desc="Make sure that you provided a valid path to the IDE config directory.",
                 ide_key=ide_key
-            )
+            )]
 
         results = []
 
-        if len(projects) == 0:
-            return self.make_error(
+        if len(sorted_projects) == 0 and len(errors) == 0 and len(self._loading) == 0:
+            return [self.make_error_item(
                 extension=extension,
                 title="No projects found",
                 ide_key=ide_key
-            )
+            )]
+
+        with timings.measure("render"):
+            launchers = extension.get_ide_launchers()
+
+            for project in sorted_projects:
+                results.append(self.render_project(extension, project, launchers.get(project.ide)))
+
+            for key, error in errors.items():
+                results.append(self.make_error_item(
+                    extension=extension,
+                    title=f"Unable to load {extension.ides[key].name} projects",
+                    desc=str(error),
+                    ide_key=key
+                ))
+
+            if len(self._loading) > 0:
+                results.append(self.make_error_item(
+                    extension=extension,
+                    title="Loading recent projects...",
+                    desc="Still loading " +
+                         ", ".join(extension.ides[key].name for key in self._loading) +
+                         " projects, results will update once they are loaded.",
+                    ide_key=ide_key
+                ))
+
+        return results
+
+    # pylint: disable=too-many-arguments,too-many-positional-arguments,too-many-locals
+    def search(self, extension: 'JetbrainsLauncherExtension', ide_key: IdeKey | None, query: str,
+               sort_by: str, limit: int, timings: Timings | None = None,
+               token: QueryToken | None = None) -> \
+            Tuple[List[IdeProject], Dict[IdeKey, BaseException], List[IdeKey]]:
+        """
+        Searches for projects matching the query in the loaded project index, IDEs still loading
+        since the warm-up or after `LOAD_TIMEOUT` are skipped. Safe to call from multiple threads,
+        the search and path indexes and cached results are shared by all callers.
+        :param extension: Extension class
+        :param ide_key: IDE to search in, all installed IDEs are searched when not set
+        :param query: Search query
+        :param sort_by: Sort mode of the results
+        :param limit: Maximum number of results
+        :param timings: Timings of the query stages
+        :param token: Token of the query job, used to stop when the query is superseded
+        :return: Sorted projects, errors of the IDEs that failed to load and IDEs still loading
+        :raises LauncherNotFound: When the launcher of the IDE is not found
+        :raises FileNotFoundError: When no IDE configs directory is found
+        """
+
+        timings = timings if timings is not None else Timings(enabled=False)
+        # Read before the candidates, a reload finishing meanwhile must not be cached as current
+        generation = extension.index.generation
+        candidates: List[IdeProject] = []
+        errors: Dict[IdeKey, BaseException] = {}
+        ide_keys: List[IdeKey] = []
+
+        if ide_key is not None:
+            with timings.measure("launchers"):
+                launcher = extension.get_ide_launcher_script(ide_key)
+
+            if not launcher:
+                raise LauncherNotFound(f"{extension.ides[ide_key].name} launcher not found")
+
+            installed = [ide_key]
+        else:
+            with timings.measure("launchers"):
+                launchers = extension.get_ide_launchers()
+
+            installed = [key for key, launcher in launchers.items() if launcher]
+
+        loading = self.get_warming(extension, installed)
+
+        # Loads running over the timeout are reported as loading and go on in the background
+        loaded, failed = extension.index.get_many(
+            [key for key in installed if key not in loading],
+            timeout=LOAD_TIMEOUT,
+            timings=timings,
+            check=token.check if token is not None else None
+        )
+
+        for key, error in failed.items():
+            if isinstance(error, LoadTimeout):
+                loading.append(key)
+            else:
+                extension.logger.warning("Unable to load %s projects: %s", key, error)
+                errors[key] = error
+
+        if len(loaded) == 0 and any(
+                isinstance(error, FileNotFoundError) for error in errors.values()):
+            raise FileNotFoundError("Cant find configs directory")
+
+        for key, key_projects in loaded.items():
+            candidates.extend(key_projects)
+            ide_keys.append(key)
+
+        candidates_key = (tuple(ide_keys), generation)
+        results_key = (ide_key, query, sort_by, limit, candidates_key)
+
+        with self._lock:
+            if ide_key is None and len(ide_keys) > 1:
+                with timings.measure("scoring"):
+                    candidates = self.get_path_index(candidates, candidates_key).projects
+
+            if token is not None:
+                token.check()
 
-        sort_by = extension.preferences.get("sort_by")
-        for project in self.sort_projects(list(projects), sort_by):
-            results.append(
-                ExtensionResultItem(
-                    icon=project.icon if project.icon is not None else
-                    extension.get_ide_icon(project.ide),
-                    name=project.name,
-                    description=project.path,
-                    on_enter=RunScriptAction(
-                        cast(str, extension.get_ide_launcher_script(project.ide)) +
-                        f' "{os.path.expanduser(project.path)}" &'
-                    ),
-                    on_alt_enter=CopyToClipboardAction(project.path)
-                )
+            sorted_projects = self.get_cached_results(results_key, timings)
+            if sorted_projects is None:
+                projects = self.select_projects(query, candidates, candidates_key, timings, token,
+                                                limit)
+
+                with timings.measure("sorting"):
+                    sorted_projects = self.sort_projects(list(projects), sort_by)
+
+                self.cache_results(results_key, sorted_projects)
+
+        return sorted_projects, errors, loading
+
+    def render_project(self, extension: 'JetbrainsLauncherExtension', project: IdeProject,
+                       launcher: str | None) -> ExtensionResultItem:
+        """
+        Creates result item of the project, items are reused while the project data
+        and the index generation stay the same. Missing and unreachable projects are marked
+        in the description, projects opened by multiple IDEs list the other IDEs on alt enter.
+        :param extension: Extension class
+        :param project: Project to render
+        :param launcher: Path to the launcher script of the project IDE
+        :return: Result item
+        """
+
+        generation, items = self._items
+        if generation != extension.index.generation:
+            items = {}
+            self._items = (extension.index.generation, items)
+
+        key = (project.ide, project.path, project.name, project.icon, project.status,
+               project.alternatives, launcher)
+        item = items.get(key)
+
+        if item is None:
+            # pylint: disable=import-outside-toplevel
+            from ulauncher.api.shared.action.CopyToClipboardAction import CopyToClipboardAction
+            from ulauncher.api.shared.action.ExtensionCustomAction import ExtensionCustomAction
+            from ulauncher.api.shared.action.RunScriptAction import RunScriptAction
+            from ulauncher.api.shared.item.ExtensionResultItem import ExtensionResultItem
+
+            description = f"{STATUS_LABELS[project.status]}: {project.path}" \
+                if project.status in STATUS_LABELS else project.path
+
+            if len(project.alternatives) > 0:
+                description += " (also in " + ", ".join(
+                    extension.ides[ide_key].name for ide_key, _ in project.alternatives
+                ) + ")"
+                on_alt_enter = ExtensionCustomAction({
+                    "path": project.path,
+                    "ides": [project.ide, *(ide_key for ide_key, _ in project.alternatives)]
+                }, keep_app_open=True)
+            else:
+                on_alt_enter = CopyToClipboardAction(project.path)
+
+            item = ExtensionResultItem(
+                icon=(project.icon if project.icon is not None
+                      else extension.get_ide_icon(project.ide)),
+                name=project.name,
+                description=description,
+                on_enter=RunScriptAction(
+                    extension.get_open_command(cast(str, launcher), project.path)
+                ),
+                on_alt_enter=on_alt_enter
             )
+            items[key] = item
 
-        return RenderResultListAction(results)
+        return item
+
+    @staticmethod
+    def get_warming(extension: 'JetbrainsLauncherExtension', ide_keys: List[IdeKey]) -> \
+            List[IdeKey]:
+        """
+        Gives IDEs loading since the warm-up a moment to finish,
+        instead of blocking the query on them
+        :param extension: Extension class
+        :param ide_keys: IDE keys needed by the query
+        :return: IDE keys that are still loading
+        """
+
+        warming = extension.index.warming()
+        if not any(ide_key in warming for ide_key in ide_keys):
+            return []
+
+        extension.index.wait([key for key in ide_keys if key in warming], timeout=WARM_UP_TIMEOUT)
+        warming = extension.index.warming()
+
+        return [ide_key for ide_key in ide_keys if ide_key in warming]
+
+    def get_cached_results(self, key: Tuple, timings: Timings) -> List[IdeProject] | None:
+        """
+        Gets results of the same query run earlier against the same candidates.
+        Metadata of the cached projects is revalidated,
+        results are dropped if a project name changed.
+        :param key: Key of the query
+        :param timings: Timings of the query stages
+        :return: Sorted projects or None if the results are not cached
+        """
+
+        cache_key = (key, ProjectMetadata.generation)
+        projects = self._results.get(cache_key)
+        if projects is None:
+            return None
+
+        with timings.measure("metadata"):
+            changed = [ProjectMetadata.resolve(project) for project in projects]
+
+        if any(changed):
+            self._results.pop(cache_key, None)
+            return None
+
+        self._results.move_to_end(cache_key)
+        return projects
+
+    def cache_results(self, key: Tuple, projects: List[IdeProject]) -> None:
+        """
+        Stores results of the query,
+        the least recently used results are dropped above the cache size
+        :param key: Key of the query
+        :param projects: Sorted projects
+        """
+
+        self._results[(key, ProjectMetadata.generation)] = projects
+        while len(self._results) > RESULTS_CACHE_SIZE:
+            self._results.popitem(last=False)
+
+    # pylint: disable=too-many-arguments,too-many-positional-arguments
+    def select_projects(self, query: str, candidates: List[IdeProject], candidates_key: Tuple,
+                        timings: Timings | None = None, token: QueryToken | None = None,
+                        limit: int = RESULTS_LIMIT) -> ProjectsList:
+        """
+        Selects projects matching the query and loads metadata of the selected ones only.
+        The selection is repeated if a custom name loaded for a selected project changes its score.
+        :param query: Search query
+        :param candidates: Projects to select from
+        :param candidates_key: Key identifying the candidates, used to reuse their search index
+        :param timings: Timings of the query stages
+        :param token: Token of the query job, checked between chunks of scored projects
+        :param limit: Maximum number of selected projects
+        :return: Selected projects
+        """
+
+        from utils.ProjectsList import ProjectsList  # pylint: disable=import-outside-toplevel
+
+        min_score = 60 if len(query) > 0 else 0
+        timings = timings if timings is not None else Timings(enabled=False)
+
+        while True:
+            with timings.measure("scoring"):
+                search_index = self.get_search_index(candidates, candidates_key)
+                if query:
+                    projects = search_index.select(query, min_score, limit,
+                                                   token.check if token is not None else None)
+                else:
+                    projects = ProjectsList(query, min_score=min_score, limit=limit)
+                    projects.extend(search_index.recent(limit))
+
+            with timings.measure("metadata"):
+                changed = [ProjectMetadata.resolve(project) for project in projects]
+
+            if not any(changed):
+                return projects
+
+    def get_path_index(self, candidates: List[IdeProject], candidates_key: Tuple) -> PathIndex:
+        """
+        Gets projects of all IDEs merged by path, merging them only when the candidates changed
+        :param candidates: Projects to merge
+        :param candidates_key: Key identifying the candidates
+        :return: Path index
+        """
+
+        from utils.PathIndex import PathIndex  # pylint: disable=import-outside-toplevel
+
+        if self._path_index is None or self._path_index[0] != candidates_key:
+            self._path_index = (candidates_key, PathIndex(candidates))
+
+        return self._path_index[1]
+
+    def get_search_index(self, candidates: List[IdeProject], candidates_key: Tuple) -> SearchIndex:
+        """
+        Gets search index of the candidates,
+        building it only when the candidates or their names changed
+        :param candidates: Projects to index
+        :param candidates_key: Key identifying the candidates
+        :return: Search index
+        """
+
+        from utils.SearchIndex import SearchIndex  # pylint: disable=import-outside-toplevel
+
+        key = (candidates_key, ProjectMetadata.generation)
+        if self._search_index is None or self._search_index[0] != key:
+            self._search_index = (key, SearchIndex(candidates))
+
+        return self._search_index[1]
 
     @staticmethod
     def sort_projects(projects: List[IdeProject], sort_by: str) -> List[IdeProject]:
@@ -121,23 +498,26 @@ class KeywordQueryEventListener(EventListener):
         return list(projects)
 
     @staticmethod
-    def make_error(extension: 'JetbrainsLauncherExtension', title: str,
-                   desc: str | None = None, ide_key: IdeKey | None = None):
+    def make_error_item(extension: 'JetbrainsLauncherExtension', title: str,
+                        desc: str | None = None, ide_key: IdeKey | None = None) -> \
+            ExtensionResultItem:
         """
-        Create an error in form of ExtensionResultItem
+        Create an error result item
         :param extension: Extension class
         :param title: The title of the error
         :param desc: The description of the error
         :param ide_key: The IDE key
-        :return RenderResultListAction with the error inside
+        :return ExtensionResultItem describing the error
         """
 
-        return RenderResultListAction([
-            ExtensionResultItem(
-                icon=extension.get_ide_icon(ide_key) \
-                    if ide_key is not None else extension.get_base_icon(),
-                name=title,
-                description=desc if desc is not None else "",
-                on_enter=HideWindowAction()
-            )
-        ])
+        # pylint: disable=import-outside-toplevel
+        from ulauncher.api.shared.action.HideWindowAction import HideWindowAction
+        from ulauncher.api.shared.item.ExtensionResultItem import ExtensionResultItem
+
+        return ExtensionResultItem(
+            icon=extension.get_ide_icon(ide_key) \
+                if ide_key is not None else extension.get_base_icon(),
+            name=title,
+            description=desc if desc is not None else "",
+            on_enter=HideWindowAction()
+        )
@@ -25,6 +25,21 @@ class PreferencesEventListener(EventListener):
         if "sort_by" not in event.preferences:
             event.preferences["sort_by"] = "none"
 
+        if "timings" not in event.preferences:
+            event.preferences["timings"] = "off"
+
+        if "merge_history" not in event.preferences:
+            event.preferences["merge_history"] = "newest"
+
+        if "ide_discovery" not in event.preferences:
+            event.preferences["ide_discovery"] = "scripts"
+
+        if "unreachable_retry" not in event.preferences:
+            event.preferences["unreachable_retry"] = "60"
+
+        if "query_service" not in event.preferences:
+            event.preferences["query_service"] = "off"
+
         aliases = extension.parse_aliases(event.preferences.get("custom_aliases"))
 
         if not any((ide_key for ide_key in aliases.values() if ide_key == "rustrover")):
@@ -32,3 +47,6 @@ class PreferencesEventListener(EventListener):
 
         extension.preferences.update(event.preferences)
         extension.set_aliases(aliases)
+        extension.update_probe_settings()
+        extension.update_paths()
+        extension.update_query_service()
@@ -23,3 +23,13 @@ class PreferencesUpdateEventListener(EventListener):
         extension.preferences[event.id] = event.new_value
         if event.id == "custom_aliases":
             extension.set_aliases(extension.parse_aliases(event.new_value))
+        elif event.id in ("configs_path", "studio_config_path"):
+            extension.update_paths(extension.get_affected_ides(event.id))
+        elif event.id == "merge_history":
+            extension.update_paths()
+        elif event.id in ("scripts_path", "ide_discovery"):
+            extension.warm_up()
+        elif event.id == "unreachable_retry":
+            extension.update_probe_settings()
+        elif event.id == "query_service":
+            extension.update_query_service()
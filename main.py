@@ -3,21 +3,43 @@ from __future__ import annotations
 
 import os
 import re
-from typing import Dict, cast
+import stat
+from typing import Any, Dict, Iterable, Iterator, List, Set, Tuple, cast, TYPE_CHECKING
 
-import semver
 from ulauncher.api.client.Extension import Extension
-from ulauncher.api.shared.event import KeywordQueryEvent, PreferencesEvent, PreferencesUpdateEvent
+from ulauncher.api.shared.event import ItemEnterEvent, KeywordQueryEvent, PreferencesEvent, \
+    PreferencesUpdateEvent
 
 from data.IdeData import IdeData
 from data.IdeKey import IdeKey
 from data.IdeProject import IdeProject
-from events.KeywordQueryEventListener import KeywordQueryEventListener
+from data.ToolboxTool import ToolboxTool
+from events.ItemEnterEventListener import ItemEnterEventListener
+from events.KeywordQueryEventListener import KeywordQueryEventListener, LauncherNotFound, \
+    RESULTS_LIMIT
 from events.PreferencesEventListener import PreferencesEventListener
 from events.PreferencesUpdateEventListener import PreferencesUpdateEventListener
+from utils.FileWatcher import FileWatcher, WatchTargets
+from utils.ProjectIndex import ProjectIndex
+from utils.ProjectMetadata import ProjectMetadata, UNREACHABLE_TTL
+from utils.QueryRunner import QueryRunner
+from utils.QueryService import QueryService
 from utils.RecentProjectsParser import RecentProjectsParser
+from utils.Snapshot import Snapshot
+from utils.Timings import Timings
+from utils.ToolboxState import ToolboxState
 
+if TYPE_CHECKING:
+    from ulauncher.api.shared.action.BaseAction import BaseAction
+    from ulauncher.api.shared.event import BaseEvent
 
+TIMINGS_ENV = "JETBRAINS_LAUNCHER_TIMINGS"
+QUERY_SOCKET_ENV = "JETBRAINS_LAUNCHER_SOCKET"
+SORT_MODES = ("none", "recent", "ascending", "descending")
+QUERY_LIMIT_MAX = 100
+
+
+# pylint: disable=too-many-public-methods,too-many-instance-attributes
 class JetbrainsLauncherExtension(Extension):
     """ Main Extension Class  """
     ides: Dict[IdeKey, IdeData] = {
@@ -45,22 +67,64 @@ class JetbrainsLauncherExtension(Extension):
 
     aliases: Dict[str, IdeKey] = {}
 
+    index: ProjectIndex
+    watcher: FileWatcher
+    snapshot: Snapshot
+    toolbox: ToolboxState
+    query_runner: QueryRunner
+    query_service: QueryService
+    _keyword_listener: KeywordQueryEventListener
+    _icons: Dict[str, str]
+    _config_dirs: Dict[str, Tuple[int, Dict[IdeKey, List[str]]]]
+    _launchers: Tuple[Tuple[str, int], Dict[IdeKey, str | None]] | None
+    _toolbox_launchers: Tuple[Dict[IdeKey, ToolboxTool], Dict[IdeKey, str | None]] | None
+
     def __init__(self):
         """ Initializes the extension """
         super().__init__()
-        self.subscribe(KeywordQueryEvent, KeywordQueryEventListener())
+        self._icons = self.find_icons()
+        self._config_dirs = {}
+        self._launchers = None
+        self._toolbox_launchers = None
+        self.toolbox = ToolboxState()
+        self.snapshot = Snapshot(self.export_state)
+        self.restore_state(self.snapshot.load())
+        self.index = ProjectIndex(self.get_recent_projects, on_update=self.snapshot.schedule)
+        self.watcher = FileWatcher.create(self.get_watch_targets, self.on_files_changed)
+        self.query_runner = QueryRunner(self.logger)
+        self.query_service = QueryService(self.answer_query, self.logger,
+                                          path=os.environ.get(QUERY_SOCKET_ENV) or None)
+        self._keyword_listener = KeywordQueryEventListener()
+        self.subscribe(KeywordQueryEvent, self._keyword_listener)
+        self.subscribe(ItemEnterEvent, ItemEnterEventListener())
         self.subscribe(PreferencesEvent, PreferencesEventListener())
         self.subscribe(PreferencesUpdateEvent, PreferencesUpdateEventListener())
 
-    @staticmethod
-    def get_base_icon():
+    @classmethod
+    def find_icons(cls) -> Dict[str, str]:
+        """
+        Finds the bundled base and IDE icons
+        :return: Paths to the existing icons, keyed by IDE key and "icon" for the base icon
+        """
+
+        images_path = os.path.join(os.path.dirname(__file__), "images")
+        icons = {}
+
+        for name in ["icon", *cls.ides.keys()]:
+            path = os.path.join(images_path, f"{name}.svg")
+            if os.path.isfile(path):
+                icons[name] = path
+
+        return icons
+
+    def get_base_icon(self) -> str:
         """
         Returns the base (project) icon
-        :return: None
+        :return: Path to the base icon
         """
 
-        path = os.path.join(os.path.dirname(__file__), "images", "icon.svg")
-        if path is None or not os.path.isfile(path):
+        path = self._icons.get("icon")
+        if path is None:
             raise FileNotFoundError("Cant find base icon")
 
         return path
@@ -121,10 +185,14 @@ class JetbrainsLauncherExtension(Extension):
 
         return next((ide_data for key, ide_data in self.ides.items() if key == ide_key), None)
 
-    def get_recent_projects(self, ide_key: IdeKey) -> list[IdeProject]:
+    def get_recent_projects(self, ide_key: IdeKey,
+                            timings: Timings | None = None) -> list[IdeProject]:
         """
-        Get parsed recent projects for specified key
+        Get parsed recent projects for specified key.
+        When the history merging preference is enabled,
+        recent projects of all IDE versions are merged.
         :param ide_key: IDE key
+        :param timings: Timings of the query that started the load
         :return: Parsed recent projects
         """
 
@@ -132,45 +200,362 @@ class JetbrainsLauncherExtension(Extension):
         if ide_data is None:
             raise AttributeError("Invalid ide key specified")
 
-        base_path = os.path.expanduser(
+        timings = timings if timings is not None else Timings(enabled=False)
+
+        with timings.measure("config", ide_key):
+            config_dirs = list(self.iter_config_dirs(ide_key)) if self.is_merging_history() else [
+                config_dir for config_dir in [self.get_config_dir(ide_key)]
+                if config_dir is not None
+            ]
+        if len(config_dirs) == 0:
+            return []
+
+        with timings.measure("parse", ide_key):
+            histories = [
+                RecentProjectsParser.parse(
+                    os.path.join(config_dir, "options", ide_data.recent_projects_file),
+                    ide_key
+                ) for config_dir in config_dirs
+            ]
+            projects = histories[0] if len(histories) == 1 else \
+                RecentProjectsParser.merge_histories(histories)
+
+        with timings.measure("metadata", ide_key):
+            for project in projects:
+                ProjectMetadata.apply_cached_name(project)
+
+        return projects
+
+    def get_config_base_path(self, ide_data: IdeData) -> str:
+        """
+        Gets the expanded path to the directory holding configs of the specified IDE
+        :param ide_data: IDE data
+        :return: Path to the configs directory
+        """
+
+        return os.path.expanduser(
             self.preferences.get(ide_data.custom_config_key) \
                 if ide_data.custom_config_key else self.preferences.get("configs_path")
         )
-        if base_path is None or not os.path.isdir(base_path):
+
+    def get_config_dir(self, ide_key: IdeKey) -> str | None:
+        """
+        Gets path to the newest config directory containing a recent projects file
+        :param ide_key: IDE key
+        :return: Path to the config directory
+        """
+
+        return next(self.iter_config_dirs(ide_key), None)
+
+    def iter_config_dirs(self, ide_key: IdeKey) -> Iterator[str]:
+        """
+        Iterates over paths to the config directories containing a recent projects file,
+        newest first
+        :param ide_key: IDE key
+        :return: Paths to the config directories
+        """
+
+        ide_data = self.get_ide_data(ide_key)
+        if ide_data is None:
+            raise AttributeError("Invalid ide key specified")
+
+        base_path = self.get_config_base_path(ide_data)
+        for directory in self.scan_config_dirs(base_path).get(ide_key, []):
+            path = os.path.join(base_path, directory)
+            if os.path.isfile(os.path.join(path, "options", ide_data.recent_projects_file)):
+                yield path
+
+    def is_merging_history(self) -> bool:
+        """
+        Checks if recent projects of all IDE versions are merged
+        :return: Result of the check
+        """
+
+        return self.preferences.get("merge_history") == "all"
+
+    def scan_config_dirs(self, base_path: str) -> Dict[IdeKey, List[str]]:
+        """
+        Lists config directories of all IDEs stored in the specified directory, newest first.
+        The result is cached until the directory modification time changes.
+        :param base_path: Path to the configs directory
+        :return: Config directory names for each IDE key
+        """
+
+        try:
+            result = os.stat(base_path)
+        except OSError as error:
+            raise FileNotFoundError("Cant find configs directory") from error
+
+        if not stat.S_ISDIR(result.st_mode):
             raise FileNotFoundError("Cant find configs directory")
 
-        versions: Dict[str, semver.VersionInfo] = {}
+        mtime = result.st_mtime_ns
+
+        cached = self._config_dirs.get(base_path)
+        if cached is not None and cached[0] == mtime:
+            return cached[1]
+
+        ides = {
+            key: ide_data for key, ide_data in self.ides.items()
+            if self.get_config_base_path(ide_data) == base_path
+        }
+        versions: Dict[IdeKey, Dict[str, Tuple[int, int, int]]] = {key: {} for key in ides}
+
         for path in os.listdir(base_path):
-            if os.path.exists(os.path.join(base_path, path, "options", ide_data.recent_projects_file)):
-                for config_prefix in ide_data.config_prefixes:
-                    match = re.match(
-                        f"^{config_prefix}" +
-                        r"(?P<major>0|[1-9]\d*)(\.(?P<minor>0|[1-9]\d*)(\.(?P<patch>0|[1-9]\d*))?)?",
-                        path)
+            for key, ide_data in ides.items():
+                version = ide_data.get_config_version(path)
 
-                    if match is not None:
-                        version_dict = {
-                            key: 0 if value is None else value for key, value in match.groupdict().items()
-                        }
+                if version is not None:
+                    versions[key][path] = version
 
-                        versions[path] = semver.VersionInfo(**version_dict)
+        config_dirs: Dict[IdeKey, List[str]] = {
+            key: sorted(ide_versions, key=ide_versions.get, reverse=True)
+            for key, ide_versions in versions.items()
+        }
 
-        if len(versions) == 0:
-            return []
+        self._config_dirs[base_path] = (mtime, config_dirs)
+        self.reserve_parse_cache()
+        return config_dirs
 
-        directory = max(versions, key=versions.get)
-        config_dir = os.path.join(
-            base_path,
-            directory,
-            "options"
-        )
+    def reserve_parse_cache(self) -> None:
+        """
+        Lets the parse cache hold recent projects files of all known config directories,
+        as all of them are read on every reload when the history of all IDE versions is merged
+        """
 
-        projects = RecentProjectsParser.parse(
-            os.path.join(config_dir, ide_data.recent_projects_file),
-            ide_key
-        )
+        RecentProjectsParser.reserve(sum(
+            len(directories) for _, config_dirs in self._config_dirs.values()
+            for directories in config_dirs.values()
+        ))
 
-        return projects
+    def get_watch_targets(self) -> WatchTargets:
+        """
+        Gets paths which changes affect the recent projects of each IDE
+        :return: Watched paths with keys of affected IDEs
+        """
+
+        targets: WatchTargets = {}
+
+        for ide_key, ide_data in self.ides.items():
+            base_path = self.get_config_base_path(ide_data)
+            targets.setdefault(base_path, set()).add(ide_key)
+
+            try:
+                directories = self.scan_config_dirs(base_path).get(ide_key, [])
+            except OSError:
+                continue
+
+            # Watch newer versions too, their recent projects file appears once the IDE is updated.
+            # All versions are watched when their histories are merged.
+            merging = self.is_merging_history()
+            for directory in directories:
+                path = os.path.join(base_path, directory, "options", ide_data.recent_projects_file)
+                targets.setdefault(path, set()).add(ide_key)
+
+                if not merging and os.path.isfile(path):
+                    break
+
+        return targets
+
+    def on_files_changed(self, ide_keys: Set[IdeKey]) -> None:
+        """
+        Reloads recent projects of IDEs affected by a change to the watched files
+        :param ide_keys: IDE keys
+        """
+
+        self.logger.debug("Reloading recent projects of: %s", ", ".join(sorted(ide_keys)))
+        self.index.refresh(ide_keys)
+        self.watcher.rewatch()
+
+    def get_affected_ides(self, preference_id: str) -> List[IdeKey]:
+        """
+        Gets IDEs which configs are located using the specified preference
+        :param preference_id: Preference ID
+        :return: IDE keys
+        """
+
+        return [
+            ide_key for ide_key, ide_data in self.ides.items()
+            if (ide_data.custom_config_key or "configs_path") == preference_id
+        ]
+
+    def update_paths(self, ide_keys: Iterable[IdeKey] | None = None) -> None:
+        """
+        Drops cached and indexed data, points the watcher at the currently configured paths
+        and warms up the dropped data
+        :param ide_keys: Keys of IDEs affected by the changed paths, all IDEs when not specified
+        """
+
+        ide_keys = list(ide_keys) if ide_keys is not None else None
+
+        # Launchers are kept, their cache key already includes the scripts directory
+        self.index.invalidate(ide_keys)
+        self.watcher.start()
+        self.warm_up(ide_keys)
+
+    def warm_up(self, ide_keys: Iterable[IdeKey] | None = None) -> None:
+        """
+        Resolves the launcher scripts and starts loading recent projects of installed IDEs
+        in the background, so the first query doesn't pay for the cold caches
+        :param ide_keys: IDE keys to warm up, all IDEs when not specified
+        """
+
+        try:
+            launchers = self.get_ide_launchers()
+        except AttributeError as error:
+            self.logger.warning("Skipping warm-up: %s", error)
+            return
+
+        self.index.warm_up([
+            ide_key for ide_key in (ide_keys if ide_keys is not None else self.ides.keys())
+            if launchers.get(ide_key)
+        ])
+
+    def update_probe_settings(self) -> None:
+        """
+        Applies preferences of the project path probes
+        """
+
+        try:
+            ProjectMetadata.unreachable_ttl = max(
+                0.0, float(self.preferences.get("unreachable_retry") or UNREACHABLE_TTL)
+            )
+        except ValueError:
+            self.logger.warning("Invalid unreachable paths retry delay, expected number of seconds")
+            ProjectMetadata.unreachable_ttl = UNREACHABLE_TTL
+
+    def update_query_service(self) -> None:
+        """
+        Starts or stops the local query service according to the preference
+        """
+
+        if self.preferences.get("query_service") == "on":
+            self.query_service.start()
+        else:
+            self.query_service.stop()
+
+    def answer_query(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Answers a query of the local query service using the project index and search caches
+        of the keyword listener
+        :param request: Query with optional "query", "ide", "sort_by" and "limit" fields
+        :return: Matching projects, errors of the IDEs that failed to load and IDEs still loading
+        :raises ValueError: When the request is invalid
+        """
+
+        query = request.get("query") or ""
+        ide = request.get("ide")
+        ide_key: IdeKey | None = None
+        sort_by = request.get("sort_by") or self.preferences.get("sort_by")
+        limit = request.get("limit", RESULTS_LIMIT)
+
+        if not isinstance(query, str):
+            raise ValueError("query must be a string")
+
+        if ide is not None:
+            if not isinstance(ide, str):
+                raise ValueError("ide must be a string")
+
+            ide = ide.lower()
+            ide_key = cast(IdeKey, ide) if self.check_ide_key(ide) else self.aliases.get(ide)
+            if ide_key is None:
+                raise ValueError(f"Unknown IDE: {request['ide']}")
+
+        if sort_by not in SORT_MODES:
+            raise ValueError(f"sort_by must be one of: {', '.join(SORT_MODES)}")
+
+        if not isinstance(limit, int) or isinstance(limit, bool) or \
+                not 0 < limit <= QUERY_LIMIT_MAX:
+            raise ValueError(f"limit must be a number between 1 and {QUERY_LIMIT_MAX}")
+
+        try:
+            projects, errors, loading = self._keyword_listener.search(
+                self, ide_key, " ".join(re.split("[ /]+", query.lower())).strip(), sort_by, limit
+            )
+        except LauncherNotFound as error:
+            return {"error": str(error)}
+        except FileNotFoundError:
+            return {"error": "Unable to find IDE configuration"}
+
+        return {
+            "results": [
+                {
+                    "name": project.name,
+                    "path": os.path.expanduser(project.path),
+                    "ide": project.ide,
+                    "timestamp": project.timestamp,
+                    "icon": project.icon,
+                    "status": project.status,
+                    "alternatives": [ide for ide, _ in project.alternatives]
+                } for project in projects
+            ],
+            "errors": {key: str(error) for key, error in errors.items()},
+            "loading": loading
+        }
+
+    def send_response(self, event: BaseEvent, action: BaseAction) -> None:
+        """
+        Sends the action rendered for the event to Ulauncher
+        :param event: Event the action responds to
+        :param action: Action to send
+        """
+
+        # pylint: disable=import-outside-toplevel,protected-access
+        from ulauncher.api.shared.Response import Response
+
+        self._client.send(Response(event, action))
+
+    def get_timings_mode(self) -> str:
+        """
+        Gets how query timings are reported, the environment variable overrides the preference
+        :return: "off", "log" or "item"
+        """
+
+        mode = os.environ.get(TIMINGS_ENV) or self.preferences.get("timings") or "off"
+        if mode in ("1", "true"):
+            return "log"
+
+        return mode if mode in ("log", "item") else "off"
+
+    def export_state(self) -> Dict[str, Any]:
+        """
+        Exports cached state saved in the snapshot
+        :return: Cached state in a JSON serializable form
+        """
+
+        return {
+            "config_dirs": dict(self._config_dirs),
+            "launchers": self._launchers,
+            "projects": RecentProjectsParser.export_cache(),
+            "names": ProjectMetadata.export_cache()
+        }
+
+    def restore_state(self, state: Dict[str, Any] | None) -> None:
+        """
+        Restores cached state from the snapshot, entries are validated when they are used
+        :param state: State exported by `export_state`
+        """
+
+        if state is None:
+            return
+
+        try:
+            for base_path, (mtime, config_dirs) in state.get("config_dirs", {}).items():
+                self._config_dirs[base_path] = (mtime, config_dirs)
+
+            launchers = state.get("launchers")
+            if launchers is not None:
+                self._launchers = (cast(Tuple[str, int], tuple(launchers[0])), launchers[1])
+
+            self.reserve_parse_cache()
+            RecentProjectsParser.restore_cache(state.get("projects", []))
+            ProjectMetadata.restore_cache(state.get("names", {}))
+        except (KeyError, TypeError, ValueError) as error:
+            self.logger.warning("Ignoring invalid snapshot: %s", error)
+            self._config_dirs = {}
+            self._launchers = None
+            RecentProjectsParser.clear_cache()
+            ProjectMetadata.clear_cache()
 
     def get_ide_icon(self, ide_key: IdeKey) -> str:
         """
@@ -182,12 +567,88 @@ class JetbrainsLauncherExtension(Extension):
         if not self.check_ide_key(ide_key):
             raise AttributeError("Invalid ide key specified")
 
-        path = os.path.join(os.path.dirname(__file__), "images", f"{ide_key}.svg")
-        if path is None or not os.path.isfile(path):
+        path = self._icons.get(ide_key)
+        if path is None:
             raise FileNotFoundError(f"Cant find {ide_key} IDE icon")
 
         return path
 
+    def get_ide_launchers(self) -> Dict[IdeKey, str | None]:
+        """
+        Gets paths to the launchers of all IDEs. When the discovery preference is set to "toolbox",
+        IDEs installed by the Toolbox app are found using its state file, the shell scripts are used
+        when the state file can't be read.
+        :return: Paths to the IDE launchers, None for IDEs that are not installed
+        """
+
+        if self.preferences.get("ide_discovery") != "toolbox":
+            return self.get_script_launchers()
+
+        tools = self.toolbox.get_tools()
+        if tools is None:
+            return self.get_script_launchers()
+
+        cached = self._toolbox_launchers
+        if cached is not None and cached[0] is tools:
+            return cached[1]
+
+        launchers: Dict[IdeKey, str | None] = {
+            ide_key: tools[ide_key].launcher if ide_key in tools else None for ide_key in self.ides
+        }
+        self.logger.debug("Found Toolbox IDEs: %s", ", ".join(
+            f"{ide_key} {'.'.join(map(str, tool.version))}" for ide_key, tool in tools.items()
+        ))
+
+        self._toolbox_launchers = (tools, launchers)
+        return launchers
+
+    def get_script_launchers(self) -> Dict[IdeKey, str | None]:
+        """
+        Gets paths to the launcher scripts of all IDEs.
+        The result is cached until the scripts directory or its preference changes.
+        :return: Paths to the IDE launcher scripts, None for IDEs that are not installed
+        """
+
+        scripts_path = self.preferences.get("scripts_path")
+        if scripts_path is None:
+            raise AttributeError("Cant find shell scripts directory")
+
+        scripts_path = os.path.expanduser(scripts_path)
+        try:
+            result = os.stat(scripts_path)
+        except OSError as error:
+            raise AttributeError("Cant find shell scripts directory") from error
+
+        if not stat.S_ISDIR(result.st_mode):
+            raise AttributeError("Cant find shell scripts directory")
+
+        cached = self._launchers
+        if cached is not None and cached[0] == (scripts_path, result.st_mtime_ns):
+            return cached[1]
+
+        scripts = set(os.listdir(scripts_path))
+        launchers: Dict[IdeKey, str | None] = {}
+
+        for ide_key, ide_data in self.ides.items():
+            launchers[ide_key] = next((
+                os.path.join(scripts_path, prefix) for prefix in ide_data.launcher_prefixes
+                if prefix in scripts and os.path.isfile(os.path.join(scripts_path, prefix))
+            ), None)
+
+        self._launchers = ((scripts_path, result.st_mtime_ns), launchers)
+        return launchers
+
+    @staticmethod
+    def get_open_command(launcher: str, path: str) -> str:
+        """
+        Gets the shell command opening the project
+        :param launcher: Path to the IDE launcher script
+        :param path: Path to the project
+        :return: Shell command
+        """
+
+        return f'{launcher} "{os.path.expanduser(path)}" &'
+
     def get_ide_launcher_script(self, ide_key: IdeKey) -> str | None:
         """
         Gets path to the IDE launcher script for specified key
@@ -195,20 +656,10 @@ class JetbrainsLauncherExtension(Extension):
         :return: Path to the IDE launcher script
         """
 
-        scripts_path = self.preferences.get("scripts_path")
-        if scripts_path is None or not os.path.isdir(os.path.expanduser(scripts_path)):
-            raise AttributeError("Cant find shell scripts directory")
-
-        ide_data = self.get_ide_data(ide_key)
-        if ide_data is None:
+        if not self.check_ide_key(ide_key):
             raise AttributeError("Invalid ide key specified")
 
-        for prefix in ide_data.launcher_prefixes:
-            path = os.path.join(os.path.expanduser(scripts_path), prefix)
-            if path is not None and os.path.isfile(path):
-                return path
-
-        return None
+        return self.get_ide_launchers().get(ide_key)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,311 @@
+""" Contains watchers notifying about changes to the IDE config files """
+from __future__ import annotations
+
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import threading
+from typing import Callable, Dict, Set, Tuple
+
+from data.IdeKey import IdeKey
+
+WatchTargets = Dict[str, Set[IdeKey]]
+Signature = Tuple[int, int, int]
+
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+IN_ONLYDIR = 0x01000000
+
+WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE | \
+             IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR
+EVENT_HEADER = struct.Struct("iIII")
+
+
+class FileWatcher:
+    """
+    Watches files and directories returned by `get_targets` and reports which IDEs were affected.
+    File targets are reported when the file is written, replaced or removed,
+    directory targets when one of their subdirectories is created, removed or renamed.
+    This implementation polls the targets and is used when inotify is not available.
+    """
+
+    _get_targets: Callable[[], WatchTargets]
+    _on_change: Callable[[Set[IdeKey]], None]
+    _interval: float
+    _thread: threading.Thread | None
+    _stopped: threading.Event
+    _wakeup: threading.Event
+    _rewatch: bool
+
+    def __init__(self, get_targets: Callable[[], WatchTargets],
+                 on_change: Callable[[Set[IdeKey]], None], interval: float = 2.0) -> None:
+        super().__init__()
+        self._get_targets = get_targets
+        self._on_change = on_change
+        self._interval = interval
+        self._thread = None
+        self._stopped = threading.Event()
+        self._wakeup = threading.Event()
+        self._rewatch = True
+
+    @staticmethod
+    def create(get_targets: Callable[[], WatchTargets],
+               on_change: Callable[[Set[IdeKey]], None]) -> FileWatcher:
+        """
+        Creates the best watcher available on this system
+        :param get_targets: Function returning paths to watch
+        :param on_change: Function called with IDE keys affected by a change
+        :return: Watcher instance
+        """
+
+        if InotifyFileWatcher.is_available():
+            return InotifyFileWatcher(get_targets, on_change)
+
+        return FileWatcher(get_targets, on_change)
+
+    @staticmethod
+    def signature(path: str) -> Signature | None:
+        """
+        Gets the signature used to detect changes to a path
+        :param path: Path to check
+        :return: Tuple of modification time, size and inode or None if the path doesn't exist
+        """
+
+        try:
+            result = os.stat(path)
+        except OSError:
+            return None
+
+        return result.st_mtime_ns, result.st_size, result.st_ino
+
+    def is_running(self) -> bool:
+        """
+        Checks if the watcher thread is running
+        :return: Result of the check
+        """
+
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> None:
+        """
+        Starts watching in a background thread, does nothing if the watcher is already running
+        """
+
+        if self.is_running():
+            self.rewatch()
+            return
+
+        self._stopped.clear()
+        self._rewatch = True
+        self._thread = threading.Thread(target=self._run, name=self.__class__.__name__, daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """
+        Stops the watcher thread
+        """
+
+        self._stopped.set()
+        self.rewatch()
+
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join()
+        self._thread = None
+
+    def rewatch(self) -> None:
+        """
+        Requests the watcher to fetch watched paths again
+        """
+
+        self._rewatch = True
+        self._wakeup.set()
+
+    def _notify(self, ide_keys: Set[IdeKey]) -> None:
+        if ide_keys:
+            self._on_change(ide_keys)
+
+    def _run(self) -> None:
+        targets: WatchTargets = {}
+        signatures: Dict[str, Signature | None] = {}
+
+        while not self._stopped.is_set():
+            if self._rewatch:
+                self._rewatch = False
+                targets = self._get_targets()
+                signatures = {
+                    path: signatures[path] if path in signatures else self.signature(path)
+                    for path in targets
+                }
+
+            changed: Set[IdeKey] = set()
+            for path, ide_keys in targets.items():
+                signature = self.signature(path)
+
+                if signature != signatures.get(path):
+                    signatures[path] = signature
+                    changed |= ide_keys
+
+            self._notify(changed)
+
+            self._wakeup.wait(self._interval)
+            self._wakeup.clear()
+
+
+class InotifyFileWatcher(FileWatcher):
+    """ Watcher receiving changes from the Linux inotify API """
+
+    _libc: ctypes.CDLL | None = None
+    _pipe: Tuple[int, int] | None = None
+
+    @staticmethod
+    def load_libc() -> ctypes.CDLL | None:
+        """
+        Loads the C library if it provides the inotify API
+        :return: Loaded library
+        """
+
+        if InotifyFileWatcher._libc is None:
+            name = ctypes.util.find_library("c")
+            if name is None:
+                return None
+
+            try:
+                libc = ctypes.CDLL(name, use_errno=True)
+            except OSError:
+                return None
+
+            if not hasattr(libc, "inotify_init1"):
+                return None
+
+            InotifyFileWatcher._libc = libc
+
+        return InotifyFileWatcher._libc
+
+    @staticmethod
+    def is_available() -> bool:
+        """
+        Checks if inotify can be used on this system
+        :return: Result of the check
+        """
+
+        return InotifyFileWatcher.load_libc() is not None
+
+    def rewatch(self) -> None:
+        self._rewatch = True
+        self._wakeup.set()
+
+        pipe = self._pipe
+        if pipe is not None:
+            try:
+                os.write(pipe[1], b"\0")
+            except OSError:
+                pass
+
+    def _run(self) -> None:
+        libc = self.load_libc()
+        fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC) if libc is not None else -1
+        if libc is None or fd < 0:
+            FileWatcher._run(self)
+            return
+
+        self._pipe = os.pipe()
+        watches: Dict[int, str] = {}
+        targets: WatchTargets = {}
+
+        try:
+            while not self._stopped.is_set():
+                if self._rewatch:
+                    self._rewatch = False
+                    targets = self._get_targets()
+                    watches = self._add_watches(libc, fd, watches, targets)
+
+                readable, _, _ = select.select([fd, self._pipe[0]], [], [])
+
+                if self._pipe[0] in readable:
+                    os.read(self._pipe[0], 512)
+
+                if fd in readable:
+                    self._notify(self._read_events(fd, watches, targets))
+        finally:
+            os.close(fd)
+            os.close(self._pipe[0])
+            os.close(self._pipe[1])
+            self._pipe = None
+
+    @staticmethod
+    def _add_watches(libc: ctypes.CDLL, fd: int, watches: Dict[int, str],
+                     targets: WatchTargets) -> Dict[int, str]:
+        for descriptor in watches:
+            libc.inotify_rm_watch(fd, descriptor)
+
+        directories = set()
+        for path in targets:
+            directory = path if os.path.isdir(path) else os.path.dirname(path)
+
+            # Watch the nearest existing parent to find out when the missing directories appear
+            while directory and not os.path.isdir(directory) and \
+                    os.path.dirname(directory) != directory:
+                directory = os.path.dirname(directory)
+
+            directories.add(directory)
+
+        result: Dict[int, str] = {}
+        for directory in directories:
+            descriptor = libc.inotify_add_watch(fd, os.fsencode(directory), WATCH_MASK)
+            if descriptor >= 0:
+                result[descriptor] = directory
+
+        return result
+
+    def _read_events(self, fd: int, watches: Dict[int, str], targets: WatchTargets) -> Set[IdeKey]:
+        changed: Set[IdeKey] = set()
+
+        while True:
+            try:
+                data = os.read(fd, 64 * 1024)
+            except BlockingIOError:
+                break
+
+            offset = 0
+            while offset + EVENT_HEADER.size <= len(data):
+                descriptor, mask, _, length = EVENT_HEADER.unpack_from(data, offset)
+                offset += EVENT_HEADER.size
+                name = os.fsdecode(data[offset:offset + length].rstrip(b"\0"))
+                offset += length
+
+                directory = watches.get(descriptor)
+                if directory is None:
+                    continue
+
+                if mask & (IN_DELETE_SELF | IN_MOVE_SELF | IN_IGNORED):
+                    # The watched directory is gone, targets need to be resolved again
+                    self._rewatch = True
+                    for path, ide_keys in targets.items():
+                        if path == directory or os.path.dirname(path) == directory:
+                            changed |= ide_keys
+                    continue
+
+                path = os.path.join(directory, name)
+                if path in targets:
+                    changed |= targets[path]
+
+                if mask & IN_ISDIR:
+                    if directory in targets:
+                        changed |= targets[directory]
+                        self._rewatch = True
+
+                    for target, ide_keys in targets.items():
+                        if target.startswith(path + os.sep):
+                            changed |= ide_keys
+                            self._rewatch = True
+
+        return changed
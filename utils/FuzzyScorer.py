@@ -0,0 +1,169 @@
+""" Contains fuzzy scorer compatible with the one found in Ulauncher's code """
+from __future__ import annotations
+
+from difflib import SequenceMatcher
+from typing import Dict, List, Tuple
+
+# Ulauncher finds matching blocks with python-Levenshtein when it's installed, so does the scorer
+try:
+    from Levenshtein import editops, matching_blocks  # type: ignore
+except ImportError:
+    editops = matching_blocks = None
+
+# Relative margin added to the score bounds, covering rounding of a differently ordered computation
+BOUND_MARGIN = 1e-9
+# SequenceMatcher ignores frequent characters of texts this long, difflib itself matches such texts
+AUTOJUNK_LENGTH = 200
+
+Block = Tuple[int, int]
+
+
+class FuzzyScorer:
+    """
+    Scores texts against a single query with the same results as `get_score`
+    from `ulauncher.utils.fuzzy_search`, without the setup it performs on every call.
+    The query is lowercased once and only positions of its characters are looked up in the texts.
+    Matching blocks are found the same way as by `difflib.SequenceMatcher`, which `get_score` uses.
+    """
+
+    query: str
+    _chars: Tuple[str, ...]
+
+    def __init__(self, query: str) -> None:
+        super().__init__()
+        self.query = query.lower()
+        self._chars = tuple(set(self.query))
+
+    def get_bound_factors(self, max_length: int) -> List[float]:
+        """
+        Gets factors turning a number of matched characters into the highest score a text can reach,
+        which is the score of all matched characters forming a single block at a word boundary.
+        The number of matched characters is the number of query characters (with repetitions)
+        found in the lowercase text, so it doesn't exceed the query length.
+        :param max_length: Length of the longest scored text
+        :return: Factor for each text length
+        """
+
+        query_len = len(self.query)
+        scale = 100 * (1 + BOUND_MARGIN)
+
+        return [0.0] + [
+            scale / (query_len + (max(query_len, length) - query_len) * 0.001)
+            for length in range(1, max_length + 1)
+        ] if query_len > 0 else [0.0] * (max_length + 1)
+
+    def score(self, text: str, text_lower: str | None = None) -> float:
+        """
+        Scores the text, the score is equal to `get_score(query, text)`
+        :param text: Text to score
+        :param text_lower: Lowercase form of the text, when it's already known
+        :return: Score from 0 to 100
+        """
+
+        query_len = len(self.query)
+        if query_len == 0 or not text:
+            return 0
+
+        text_lower = text_lower if text_lower is not None else text.lower()
+        if len(text_lower) != len(text):
+            # Block indexes of the lowercase text don't point into the text, leave it to Ulauncher
+            # pylint: disable=import-outside-toplevel
+            from ulauncher.utils.fuzzy_search import get_score  # type: ignore
+            return get_score(self.query, text)
+
+        max_len = max(query_len, len(text))
+        blocks = self.get_matching_blocks(text_lower)
+
+        base_similarity = sum(length for _, length in blocks) / query_len
+        for index, _ in blocks:
+            if index != 0 and text[index - 1] != " ":
+                base_similarity -= 0.5 / query_len
+
+        return 100 * base_similarity * query_len / (query_len + (max_len - query_len) * 0.001)
+
+    # Runs for every scored text, splitting it into calls per block slows the scoring by 5-10%
+    # pylint: disable=too-many-locals,too-many-branches
+    def get_matching_blocks(self, text: str) -> List[Block]:
+        """
+        Finds blocks of the query found in the text
+        :param text: Lowercase text
+        :return: Text index and length of each block, ordered by the query index
+        """
+
+        query = self.query
+        if matching_blocks is not None:
+            return [
+                (index, length)
+                for _, index, length in matching_blocks(editops(query, text), query, text)[:-1]
+            ]
+
+        if len(text) >= AUTOJUNK_LENGTH:
+            return [
+                (index, length)
+                for _, index, length
+                in SequenceMatcher(None, query, text).get_matching_blocks()[:-1]
+            ]
+
+        # Positions of the query characters,
+        # the only part of `SequenceMatcher.b2j` that is ever read
+        positions: Dict[str, List[int]] = {}
+        for char in self._chars:
+            index = text.find(char)
+            if index < 0:
+                continue
+
+            char_positions = positions[char] = []
+            while index >= 0:
+                char_positions.append(index)
+                index = text.find(char, index + 1)
+
+        if not positions:
+            return []
+
+        found = []
+        queue = [(0, len(query), 0, len(text))]
+        nothing: List[int] = []
+
+        while queue:
+            query_lo, query_hi, text_lo, text_hi = queue.pop()
+
+            # Same search as `SequenceMatcher.find_longest_match`, texts this short have no junk
+            best_i, best_j, best_size = query_lo, text_lo, 0
+            lengths: Dict[int, int] = {}
+            for i in range(query_lo, query_hi):
+                new_lengths = {}
+                for j in positions.get(query[i], nothing):
+                    if j < text_lo:
+                        continue
+                    if j >= text_hi:
+                        break
+
+                    size = new_lengths[j] = lengths.get(j - 1, 0) + 1
+                    if size > best_size:
+                        best_i, best_j, best_size = i - size + 1, j - size + 1, size
+                lengths = new_lengths
+
+            if best_size:
+                found.append((best_i, best_j, best_size))
+                if query_lo < best_i and text_lo < best_j:
+                    queue.append((query_lo, best_i, text_lo, best_j))
+                if best_i + best_size < query_hi and best_j + best_size < text_hi:
+                    queue.append((best_i + best_size, query_hi, best_j + best_size, text_hi))
+
+        found.sort()
+
+        # Adjacent blocks are joined, as in `SequenceMatcher.get_matching_blocks`
+        blocks = []
+        last_i = last_j = last_size = 0
+        for i, j, size in found:
+            if last_i + last_size == i and last_j + last_size == j:
+                last_size += size
+            else:
+                if last_size:
+                    blocks.append((last_j, last_size))
+                last_i, last_j, last_size = i, j, size
+
+        if last_size:
+            blocks.append((last_j, last_size))
+
+        return blocks
@@ -0,0 +1,56 @@
+""" Contains index of recent projects shared by all IDEs """
+from __future__ import annotations
+
+import os
+from typing import Dict, List
+
+from data.IdeProject import IdeProject
+
+
+class PathIndex:
+    """
+    Merges recent projects of all IDEs into a single project for each path.
+    Merged projects are opened in the most recently used IDE, other IDEs are listed as alternatives.
+    """
+
+    projects: List[IdeProject]
+
+    def __init__(self, projects: List[IdeProject]) -> None:
+        super().__init__()
+        groups: Dict[str, List[IdeProject]] = {}
+
+        for project in projects:
+            groups.setdefault(self.normalize_path(project.path), []).append(project)
+
+        self.projects = [self.merge(group) for group in groups.values()]
+
+    @staticmethod
+    def normalize_path(path: str) -> str:
+        """
+        Normalizes the project path, so the same project stored differently by each IDE has one key
+        :param path: Project path
+        :return: Normalized path
+        """
+
+        return os.path.normpath(os.path.expanduser(path))
+
+    @staticmethod
+    def merge(group: List[IdeProject]) -> IdeProject:
+        """
+        Merges recent projects pointing to the same path
+        :param group: Projects of different IDEs
+        :return: Project opened by the most recently used IDE, or the only project in the group
+        """
+
+        if len(group) == 1:
+            return group[0]
+
+        group = sorted(group, key=lambda item: -item.timestamp if item.timestamp is not None else 0)
+        latest = group[0]
+
+        project = IdeProject(name=latest.name, ide=latest.ide, path=latest.path,
+                             timestamp=latest.timestamp, icon=latest.icon)
+        project.status = latest.status
+        project.alternatives = tuple((item.ide, item.timestamp) for item in group[1:])
+
+        return project
@@ -0,0 +1,280 @@
+""" Contains in-memory index of recent projects """
+from __future__ import annotations
+
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple, cast
+
+from data.IdeKey import IdeKey
+from data.IdeProject import IdeProject
+from utils.Timings import Timings
+
+MAX_WORKERS = 4
+# Loads are awaited in slices of this many seconds when the caller checks for cancellation
+WAIT_INTERVAL = 0.05
+
+Loader = Callable[[IdeKey, Optional[Timings]], List[IdeProject]]
+
+
+class LoadTimeout(TimeoutError):
+    """ Reported for IDEs whose projects didn't load in time, the load itself goes on """
+
+
+# pylint: disable=too-many-instance-attributes
+class ProjectIndex:
+    """
+    Keeps recent projects of every IDE in memory.
+    Projects are loaded once, in parallel, and reloaded only for IDEs marked as changed.
+    Without workers, projects are loaded in the thread requesting them, e.g. to profile the loads.
+    """
+
+    generation: int
+    _loader: Loader
+    _on_update: Callable[[], None] | None
+    _projects: Dict[IdeKey, List[IdeProject]]
+    _versions: Dict[IdeKey, int]
+    _dirty: Set[IdeKey]
+    _pending: Dict[IdeKey, Future]
+    _warming: Set[IdeKey]
+    _executor: ThreadPoolExecutor | None
+    _lock: threading.Lock
+
+    def __init__(self, loader: Loader,
+                 max_workers: int = MAX_WORKERS,
+                 on_update: Callable[[], None] | None = None) -> None:
+        super().__init__()
+        self.generation = 0
+        self._loader = loader
+        self._on_update = on_update
+        self._projects = {}
+        self._versions = {}
+        self._dirty = set()
+        self._pending = {}
+        self._warming = set()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers,
+                                            thread_name_prefix=self.__class__.__name__) \
+            if max_workers > 0 else None
+        self._lock = threading.Lock()
+
+    def __contains__(self, ide_key: IdeKey) -> bool:
+        return ide_key in self._projects and ide_key not in self._dirty
+
+    def get(self, ide_key: IdeKey, timings: Timings | None = None) -> List[IdeProject]:
+        """
+        Gets recent projects of the specified IDE, loading them if they are not indexed yet
+        :param ide_key: IDE key
+        :param timings: Timings of the query, the load is measured only if it's started by the query
+        :return: Recent projects
+        """
+
+        projects = self._projects.get(ide_key)
+        if projects is not None and ide_key not in self._dirty:
+            return projects
+
+        return self.load(ide_key, timings)
+
+    def get_many(self, ide_keys: Iterable[IdeKey], timeout: float | None = None,
+                 timings: Timings | None = None, check: Callable[[], None] | None = None) -> \
+            Tuple[Dict[IdeKey, List[IdeProject]], Dict[IdeKey, BaseException]]:
+        """
+        Gets recent projects of the specified IDEs, loading the missing ones in parallel
+        :param ide_keys: IDE keys
+        :param timeout: Time in seconds after which IDEs still loading get `LoadTimeout` errors
+        :param timings: Timings of the query, loads are measured only if the query started them
+        :param check: Called every `WAIT_INTERVAL` seconds while waiting, raises to stop waiting
+        :return: Recent projects and errors, both in the order of the specified IDE keys
+        """
+
+        ide_keys = list(ide_keys)
+        with self._lock:
+            indexed = {
+                ide_key: self._projects[ide_key] for ide_key in ide_keys
+                if ide_key in self._projects and ide_key not in self._dirty
+            }
+
+        futures = {
+            ide_key: self.load_async(ide_key, timings=timings)
+            for ide_key in ide_keys if ide_key not in indexed
+        }
+        self.wait_futures(list(futures.values()), timeout, check)
+
+        results: Dict[IdeKey, List[IdeProject]] = {}
+        errors: Dict[IdeKey, BaseException] = {}
+
+        for ide_key in ide_keys:
+            future = futures.get(ide_key)
+
+            if future is None:
+                results[ide_key] = indexed[ide_key]
+            elif not future.done():
+                errors[ide_key] = LoadTimeout(f"Loading projects took longer than {timeout}s")
+            elif future.exception() is not None:
+                errors[ide_key] = cast(BaseException, future.exception())
+            else:
+                results[ide_key] = future.result()
+
+        return results, errors
+
+    @staticmethod
+    def wait_futures(futures: List[Future], timeout: float | None,
+                     check: Callable[[], None] | None) -> None:
+        """
+        Waits until the loads finish or the timeout passes
+        :param futures: Loads to wait for
+        :param timeout: Maximum time to wait in seconds
+        :param check: Called every `WAIT_INTERVAL` seconds while waiting, raises to stop waiting
+        """
+
+        if check is None:
+            wait(futures, timeout=timeout)
+            return
+
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        while True:
+            remaining = deadline - time.monotonic() if deadline is not None else WAIT_INTERVAL
+            if remaining <= 0:
+                return
+
+            _, not_done = wait(futures, timeout=min(remaining, WAIT_INTERVAL))
+            if len(not_done) == 0:
+                return
+
+            check()
+            futures = list(not_done)
+
+    def load(self, ide_key: IdeKey, timings: Timings | None = None) -> List[IdeProject]:
+        """
+        Loads recent projects of the specified IDE into the index
+        :param ide_key: IDE key
+        :param timings: Timings of the query, the load is measured only if it's started by the query
+        :return: Recent projects
+        """
+
+        return self.load_async(ide_key, timings=timings).result()
+
+    def load_async(self, ide_key: IdeKey, warm_up: bool = False,
+                   timings: Timings | None = None) -> Future:
+        """
+        Starts loading recent projects of the specified IDE in a worker thread,
+        without workers the projects are loaded before returning.
+        A load already in progress is shared,
+        its stages are measured by the timings it was started with.
+        :param ide_key: IDE key
+        :param warm_up: Whether the IDE is loaded ahead of queries and is reported by `warming`
+        :param timings: Timings the loader measures its stages with
+        :return: Future resolving to the recent projects
+        """
+
+        with self._lock:
+            if warm_up:
+                self._warming.add(ide_key)
+
+            future = self._pending.get(ide_key)
+            if future is not None:
+                return future
+
+            version = self._versions.get(ide_key, 0)
+            if self._executor is not None:
+                future = self._executor.submit(self._load, ide_key, version, timings)
+                self._pending[ide_key] = future
+                return future
+
+            future = self._pending[ide_key] = Future()
+
+        try:
+            future.set_result(self._load(ide_key, version, timings))
+        except Exception as error:  # pylint: disable=broad-except
+            future.set_exception(error)
+
+        return future
+
+    def _load(self, ide_key: IdeKey, version: int, timings: Timings | None) -> List[IdeProject]:
+        try:
+            projects = self._loader(ide_key, timings)
+        except BaseException:
+            with self._lock:
+                if self._versions.get(ide_key, 0) == version:
+                    self._pending.pop(ide_key, None)
+                    self._projects.pop(ide_key, None)
+
+                if ide_key not in self._pending:
+                    self._warming.discard(ide_key)
+            raise
+
+        with self._lock:
+            # Results of a load started before the IDE was invalidated are outdated
+            if self._versions.get(ide_key, 0) == version:
+                self._pending.pop(ide_key, None)
+                self._projects[ide_key] = projects
+                self._dirty.discard(ide_key)
+                self.generation += 1
+
+            if ide_key not in self._pending:
+                self._warming.discard(ide_key)
+
+        if self._on_update is not None:
+            self._on_update()
+
+        return projects
+
+    def warm_up(self, ide_keys: Iterable[IdeKey]) -> None:
+        """
+        Starts loading recent projects of the specified IDEs that are not indexed yet,
+        queries can skip IDEs reported by `warming` instead of waiting for them
+        :param ide_keys: IDE keys
+        """
+
+        for ide_key in ide_keys:
+            if ide_key not in self:
+                self.load_async(ide_key, warm_up=True)
+
+    def warming(self) -> Set[IdeKey]:
+        """
+        Gets IDEs which recent projects are still loading since a warm-up
+        :return: IDE keys
+        """
+
+        with self._lock:
+            return set(self._warming)
+
+    def wait(self, ide_keys: Iterable[IdeKey], timeout: float | None = None) -> bool:
+        """
+        Waits until recent projects of the specified IDEs are no longer loading
+        :param ide_keys: IDE keys
+        :param timeout: Maximum time to wait in seconds
+        :return: True if none of the IDEs is loading anymore
+        """
+
+        with self._lock:
+            futures = [self._pending[ide_key] for ide_key in ide_keys if ide_key in self._pending]
+
+        _, not_done = wait(futures, timeout=timeout)
+        return len(not_done) == 0
+
+    def refresh(self, ide_keys: Iterable[IdeKey]) -> None:
+        """
+        Reloads recent projects of the specified IDEs, errors are left to be reported by `get`
+        :param ide_keys: IDE keys
+        """
+
+        ide_keys = list(ide_keys)
+        self.invalidate(ide_keys)
+        wait([self.load_async(ide_key) for ide_key in ide_keys])
+
+    def invalidate(self, ide_keys: Iterable[IdeKey] | None = None) -> None:
+        """
+        Marks recent projects of the specified IDEs as outdated
+        :param ide_keys: IDE keys, all indexed IDEs when not specified
+        """
+
+        with self._lock:
+            ide_keys = set(self._projects.keys()) | set(self._pending.keys()) \
+                if ide_keys is None else set(ide_keys)
+
+            for ide_key in ide_keys:
+                self._versions[ide_key] = self._versions.get(ide_key, 0) + 1
+                self._pending.pop(ide_key, None)
+
+            self._dirty.update(ide_keys)
+            self.generation += 1
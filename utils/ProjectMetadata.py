@@ -0,0 +1,413 @@
+""" Contains loader for metadata stored in the projects ".idea" directories """
+from __future__ import annotations
+
+import concurrent.futures
+import glob
+import os
+import re
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple, TypedDict, TypeVar, cast
+
+from data.IdeProject import IdeProject
+from data.ProjectStatus import ProjectStatus
+
+PROBE_TIMEOUT = 0.5
+# Mounts may be slow to respond at first, e.g. a network home directory right after the login
+FIRST_PROBE_TIMEOUT = 2.0
+PROBE_WORKERS = 4
+UNREACHABLE_TTL = 60.0
+MOUNTS_PATH = "/proc/self/mounts"
+MOUNTS_TTL = 5.0
+
+MetadataEntry = TypedDict("MetadataEntry", {
+    "mtime": Optional[int],
+    "name": Optional[str],
+    "icon": Optional[str],
+    "has_icon": bool,
+    "status": ProjectStatus
+})
+
+T = TypeVar("T")
+
+
+class PathUnreachable(Exception):
+    """
+    Raised when a project path probe timed out or the path is on a mount known to be unreachable
+    """
+
+
+class ProbeQueued(Exception):
+    """ Raised when a probe didn't start before the timeout, workers being busy with other paths """
+
+
+class ProjectMetadata:
+    """
+    Loads custom names and icons of projects on demand.
+    Loaded metadata is cached per project and read again when its ".idea" directory changes.
+    Project paths are probed in a worker pool with a timeout, mount points of paths that time out
+    are skipped until `unreachable_ttl` passes. Only one probe per mount point runs at a time,
+    so a hung mount holds a single worker and other paths on it wait for its result.
+    The first probe of each mount point gets the longer `first_probe_timeout`.
+    """
+
+    generation = 0
+    probe_timeout = PROBE_TIMEOUT
+    first_probe_timeout = FIRST_PROBE_TIMEOUT
+    unreachable_ttl = UNREACHABLE_TTL
+    _cache: Dict[str, MetadataEntry] = {}
+    _unreachable: Dict[str, float] = {}
+    _in_flight: Dict[str, concurrent.futures.Future] = {}
+    _probed: Set[str] = set()
+    _mounts: Tuple[float, List[Tuple[str, str]]] = (0.0, [])
+    _executor: concurrent.futures.ThreadPoolExecutor | None = None
+    _lock = threading.Lock()
+
+    @staticmethod
+    def probe(full_path: str, function: Callable[..., T], *args: Any) -> T:
+        """
+        Runs a filesystem probe of the project path in the probe worker pool,
+        waiting first for a probe running on the same mount point
+        :param full_path: Expanded path to the project
+        :param function: Probe to run
+        :param args: Probe arguments
+        :raise PathUnreachable: If the probe timed out or the path mount point is unreachable
+        :raise ProbeQueued: If the probe didn't start before the timeout
+        :return: Result of the probe
+        """
+
+        mount_point = ProjectMetadata.get_mount_point(full_path)
+        # Paths on the root filesystem are their own mount points, they don't get the first probe
+        first = mount_point != full_path and mount_point not in ProjectMetadata._probed
+        timeout = max(ProjectMetadata.probe_timeout, ProjectMetadata.first_probe_timeout) \
+            if first else ProjectMetadata.probe_timeout
+
+        while True:
+            if ProjectMetadata.is_unreachable(full_path):
+                raise PathUnreachable(full_path)
+
+            with ProjectMetadata._lock:
+                pending = ProjectMetadata._in_flight.get(mount_point)
+
+                if pending is None or pending.done():
+                    if ProjectMetadata._executor is None:
+                        ProjectMetadata._executor = concurrent.futures.ThreadPoolExecutor(
+                            max_workers=PROBE_WORKERS, thread_name_prefix=ProjectMetadata.__name__
+                        )
+
+                    future = ProjectMetadata._executor.submit(function, *args)
+                    ProjectMetadata._in_flight[mount_point] = future
+                    break
+
+            # Only a timeout of the path own probe tells that the mount point is unreachable
+            done, _ = concurrent.futures.wait([pending], timeout=timeout)
+            if not done:
+                raise ProbeQueued(full_path)
+
+        future.add_done_callback(lambda _: ProjectMetadata.finish_probe(mount_point, future, first))
+
+        try:
+            return future.result(timeout=timeout)
+        except concurrent.futures.TimeoutError as error:
+            raise ProjectMetadata.get_timeout_error(future, mount_point, full_path) from error
+
+    @staticmethod
+    def finish_probe(mount_point: str, future: concurrent.futures.Future,
+                     first: bool = False) -> None:
+        """
+        Lets other probes of the mount point run once the probe finished
+        :param mount_point: Mount point of the probed path
+        :param future: Finished probe
+        :param first: Whether it was the first probe of the mount point
+        """
+
+        with ProjectMetadata._lock:
+            if ProjectMetadata._in_flight.get(mount_point) is future:
+                del ProjectMetadata._in_flight[mount_point]
+
+            if first and not future.cancelled():
+                ProjectMetadata._probed.add(mount_point)
+
+    @staticmethod
+    def get_timeout_error(future: concurrent.futures.Future, mount_point: str,
+                          full_path: str) -> Exception:
+        """
+        Handles a probe of the path that didn't finish in time, marking its mount point
+        as unreachable only if the probe was running. A probe that didn't start waited for workers
+        stuck on other mount points, the path itself may be fine.
+        :param future: Probe that timed out
+        :param mount_point: Mount point of the probed path
+        :param full_path: Expanded path to the project
+        :return: PathUnreachable if the probe was running, ProbeQueued otherwise
+        """
+
+        if future.cancel() or not future.running():
+            return ProbeQueued(full_path)
+
+        with ProjectMetadata._lock:
+            ProjectMetadata._unreachable[mount_point] = \
+                time.monotonic() + ProjectMetadata.unreachable_ttl
+
+        return PathUnreachable(full_path)
+
+    @staticmethod
+    def get_mount_points() -> List[Tuple[str, str]]:
+        """
+        Gets mount points of the mounted filesystems except the root one, read again after
+        `MOUNTS_TTL` seconds
+        :return: Mount points and prefixes of the paths on them, from the longest mount point
+        """
+
+        now = time.monotonic()
+        expires, cached = ProjectMetadata._mounts
+        if expires > now:
+            return cached
+
+        try:
+            with open(MOUNTS_PATH, "r", encoding="utf8") as file:
+                # Whitespace in mount points is escaped as octal codes
+                mount_points = [
+                    re.sub(r"\\([0-7]{3})", lambda match: chr(int(match.group(1), 8)),
+                           line.split(" ")[1])
+                    for line in file
+                ]
+        except (OSError, IndexError, UnicodeError):
+            mount_points = []
+
+        mounts = [
+            (path, path.rstrip("/") + "/")
+            for path in sorted(set(mount_points), key=len, reverse=True) if path != "/"
+        ]
+        ProjectMetadata._mounts = (now + MOUNTS_TTL, mounts)
+        return mounts
+
+    @staticmethod
+    def get_mount_point(full_path: str) -> str:
+        """
+        Finds the mount point of the path without touching the path itself, which may hang
+        :param full_path: Expanded path to the project
+        :return: Mount point,
+            or the path itself if it's on the root filesystem or mounts are unknown
+        """
+
+        for mount_point, prefix in ProjectMetadata.get_mount_points():
+            if full_path.startswith(prefix) or full_path == mount_point:
+                return mount_point
+
+        return full_path
+
+    @staticmethod
+    def is_unreachable(full_path: str) -> bool:
+        """
+        Checks if the path is on a mount point marked as unreachable
+        :param full_path: Expanded path to the project
+        :return: Result of the check
+        """
+
+        if len(ProjectMetadata._unreachable) == 0:
+            return False
+
+        now = time.monotonic()
+        with ProjectMetadata._lock:
+            for mount_point, expires in list(ProjectMetadata._unreachable.items()):
+                if expires <= now:
+                    del ProjectMetadata._unreachable[mount_point]
+                elif full_path == mount_point or \
+                        full_path.startswith(mount_point.rstrip("/") + "/"):
+                    return True
+
+        return False
+
+    @staticmethod
+    def get_idea_mtime(full_path: str) -> int | None:
+        """
+        Gets the modification time of the project ".idea" directory
+        :param full_path: Expanded path to the project
+        :return: Modification time or None if the directory doesn't exist
+        """
+
+        try:
+            return os.stat(os.path.join(full_path, ".idea")).st_mtime_ns
+        except OSError:
+            return None
+
+    @staticmethod
+    def read_name(full_path: str) -> str | None:
+        """
+        Reads the custom project name
+        :param full_path: Expanded path to the project
+        :return: Custom name or None if the project doesn't have one
+        """
+
+        try:
+            with open(os.path.join(full_path, ".idea", ".name"), "r", encoding="utf8") as file:
+                return file.read().replace("\n", "") or None
+        except (OSError, UnicodeDecodeError):
+            return None
+
+    @staticmethod
+    def find_icon(full_path: str) -> str | None:
+        """
+        Finds the custom project icon
+        :param full_path: Expanded path to the project
+        :return: Path to the icon or None if the project doesn't have one
+        """
+
+        icons = glob.glob(os.path.join(glob.escape(full_path), ".idea", "icon.*"))
+        return icons[0] if len(icons) > 0 else None
+
+    @staticmethod
+    def read_entry(full_path: str, previous: MetadataEntry | None) -> MetadataEntry:
+        """
+        Reads metadata of the project,
+        reusing the previous metadata if the ".idea" directory didn't change
+        :param full_path: Expanded path to the project
+        :param previous: Previously loaded metadata
+        :return: Metadata of the project
+        """
+
+        mtime = ProjectMetadata.get_idea_mtime(full_path)
+        if mtime is None:
+            return {
+                "mtime": None,
+                "name": None,
+                "icon": None,
+                "has_icon": True,
+                # Rider stores paths of solution files instead of directories
+                "status": "ok" if os.path.exists(full_path) else "missing"
+            }
+
+        if previous is not None and previous["mtime"] == mtime and previous["status"] == "ok":
+            return previous
+
+        return {
+            "mtime": mtime,
+            "name": ProjectMetadata.read_name(full_path),
+            "icon": None,
+            "has_icon": False,
+            "status": "ok"
+        }
+
+    @staticmethod
+    def get_entry(full_path: str, revalidate: bool = False) -> MetadataEntry:
+        """
+        Gets cached metadata of the project, loading its name if it isn't known yet.
+        Cached metadata of unreachable projects is kept and marked as unreachable, it's loaded again
+        once the mount point is no longer skipped. Probes that didn't start in time aren't cached.
+        :param full_path: Expanded path to the project
+        :param revalidate: Checks if the ".idea" directory changed since the metadata was loaded
+        :return: Metadata of the project
+        """
+
+        previous = ProjectMetadata._cache.get(full_path)
+        if previous is not None and not revalidate and (
+                previous["status"] != "unreachable" or ProjectMetadata.is_unreachable(full_path)):
+            return previous
+
+        try:
+            entry = ProjectMetadata.probe(full_path, ProjectMetadata.read_entry, full_path,
+                                          previous)
+        except ProbeQueued:
+            return previous if previous is not None else \
+                {"mtime": None, "name": None, "icon": None, "has_icon": True, "status": "ok"}
+        except PathUnreachable:
+            entry = cast(MetadataEntry, {**previous, "status": "unreachable"}) \
+                if previous is not None else \
+                {"mtime": None, "name": None, "icon": None, "has_icon": True,
+                 "status": "unreachable"}
+
+        if entry is previous:
+            return entry
+
+        with ProjectMetadata._lock:
+            previous = ProjectMetadata._cache.get(full_path)
+            ProjectMetadata._cache[full_path] = entry
+
+            # Search indexes score projects on their names, including names resolved the first time
+            if (previous["name"] if previous is not None else None) != entry["name"]:
+                ProjectMetadata.generation += 1
+
+        return entry
+
+    @staticmethod
+    def apply_cached_name(project: IdeProject) -> None:
+        """
+        Sets the project name to its cached custom name without touching the filesystem,
+        projects without cached metadata keep their directory name until they are resolved
+        :param project: Project to update
+        """
+
+        entry = ProjectMetadata._cache.get(os.path.expanduser(project.path))
+        if entry is not None:
+            project.name = entry["name"] or os.path.basename(project.path)
+            project.status = entry["status"]
+
+    @staticmethod
+    def resolve(project: IdeProject) -> bool:
+        """
+        Loads up-to-date name, icon and status of the project
+        :param project: Project to update
+        :return: True if the project name changed
+        """
+
+        full_path = os.path.expanduser(project.path)
+        entry = ProjectMetadata.get_entry(full_path, revalidate=True)
+
+        if not entry["has_icon"] and entry["status"] == "ok":
+            try:
+                entry["icon"] = ProjectMetadata.probe(full_path, ProjectMetadata.find_icon,
+                                                      full_path)
+                entry["has_icon"] = True
+            except (PathUnreachable, ProbeQueued):
+                pass
+
+        name = entry["name"] or os.path.basename(project.path)
+        changed = name != project.name
+
+        project.name = name
+        project.icon = entry["icon"]
+        project.status = entry["status"]
+
+        return changed
+
+    @staticmethod
+    def export_cache() -> Dict[str, List]:
+        """
+        Exports cached custom names in a JSON serializable form
+        :return: Modification times of ".idea" directories and names for each project path
+        """
+
+        with ProjectMetadata._lock:
+            return {
+                path: [entry["mtime"], entry["name"]]
+                for path, entry in ProjectMetadata._cache.items()
+            }
+
+    @staticmethod
+    def restore_cache(names: Dict[str, List]) -> None:
+        """
+        Fills the cache with custom names exported by `export_cache`
+        :param names: Exported names
+        """
+
+        with ProjectMetadata._lock:
+            for path, (mtime, name) in names.items():
+                ProjectMetadata._cache.setdefault(path, {
+                    "mtime": mtime,
+                    "name": name,
+                    "icon": None,
+                    "has_icon": mtime is None,
+                    "status": "ok"
+                })
+
+    @staticmethod
+    def clear_cache() -> None:
+        """
+        Removes all cached metadata
+        """
+
+        with ProjectMetadata._lock:
+            ProjectMetadata._cache.clear()
+            ProjectMetadata._unreachable.clear()
+            ProjectMetadata._probed.clear()
+            ProjectMetadata._mounts = (0.0, [])
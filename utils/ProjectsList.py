@@ -1,36 +1,51 @@
 """ Contains custom implementation of SortedList found in Ulauncher's code """
-from typing import Iterator, List
+from __future__ import annotations
 
-from ulauncher.utils.SortedCollection import SortedCollection  # type: ignore
-from ulauncher.utils.fuzzy_search import get_score  # type: ignore
+import heapq
+from typing import Iterator, List, Tuple
 
 from data.IdeProject import IdeProject
+from utils.FuzzyScorer import FuzzyScorer
+
+
+def recency_key(item: IdeProject) -> float:
+    """
+    Gets the key ordering projects from the most recently opened, projects without timestamp go last
+    :param item: Project
+    :return: Sorting key
+    """
+
+    return -item.timestamp if item.timestamp is not None else 0
 
 
 class ProjectsList:
     """
     List maintains items in a sorted order
     (sorted by a score, which is a similarity between item's name and a query)
-    and limited to a number `limit` passed into the constructor
+    and limited to a number `limit` passed into the constructor.
+    Items with equal keys keep the order in which they were added, unless the order is given.
     """
 
+    scorer: FuzzyScorer
     _query: str
     _min_score: int
     _limit: int
-    _items: SortedCollection
+    _heap: List[Tuple[float, int, IdeProject]]
+    _counter: int
+    _sorted: List[IdeProject] | None
 
     def __init__(self, query, min_score=30, limit=9) -> None:
         self._query = query.lower().strip()
+        self.scorer = FuzzyScorer(self._query)
         self._min_score = min_score
         self._limit = limit
-        self._items = SortedCollection(
-            key=lambda item:
-            (-item.timestamp if item.timestamp is not None else 0)
-            if not self._query else item.score
-        )
+        # Bounded heap holding the worst kept item on top, keys are negated for that reason
+        self._heap = []
+        self._counter = 0
+        self._sorted = None
 
     def __len__(self) -> int:
-        return len(self._items)
+        return len(self._heap)
 
     def __getitem__(self, i) -> IdeProject:
         return self._items[i]
@@ -48,6 +63,25 @@ class ProjectsList:
     def __contains__(self, item: IdeProject) -> bool:
         return item in self._items
 
+    @property
+    def threshold(self) -> float | None:
+        """
+        Gets score an item has to exceed to be added, once the list is full
+        :return: Score of the worst kept item or None if the list isn't full
+        """
+
+        if self._limit == 0:
+            return float("inf")
+
+        return self._heap[0][0] if len(self._heap) >= self._limit else None
+
+    @property
+    def _items(self) -> List[IdeProject]:
+        if self._sorted is None:
+            self._sorted = [item for _, _, item in sorted(self._heap, reverse=True)]
+
+        return self._sorted
+
     def extend(self, items: List[IdeProject]) -> None:
         """
         Merges all provided items into this list
@@ -61,22 +95,30 @@ class ProjectsList:
         Adds item to the list
         :param item: Item to add
         """
-        name = item.name
-        path = item.path.replace(r"^~", "")
-
         if not self._query:
-            self._items.insert(item)
-
-            while len(self._items) > self._limit:
-                self._items.pop()
+            self._push(recency_key(item), item)
         else:
-            score = max(get_score(self._query, name), get_score(self._query, path))
+            self.insert(max(self.scorer.score(item.name), self.scorer.score(item.path)), item)
 
-            if score >= self._min_score:
-                # use negative to sort by score in desc. order
-                item.score = -score
-
-                self._items.insert(item)
-                while len(self._items) > self._limit:
-                    # remove items with the lowest score to maintain limited number of items
-                    self._items.pop()
+    def insert(self, score: float, item: IdeProject, order: int | None = None) -> None:
+        """
+        Adds already scored item to the list
+        :param score: Score of the item
+        :param item: Item to add
+        :param order: Position of the item among equally scored items,
+            defaults to the order of adding
+        """
+        if score >= self._min_score:
+            # Scores are kept in the heap entries, projects are shared by all queries
+            self._push(-score, item, order)
+
+    def _push(self, key: float, item: IdeProject, order: int | None = None) -> None:
+        entry = (-key, -(order if order is not None else self._counter), item)
+        self._counter += 1
+        self._sorted = None
+
+        if len(self._heap) < self._limit:
+            heapq.heappush(self._heap, entry)
+        elif self._limit > 0 and entry > self._heap[0]:
+            # remove the item with the lowest score to maintain limited number of items
+            heapq.heapreplace(self._heap, entry)
@@ -0,0 +1,97 @@
+""" Contains runner of cancellable query jobs """
+from __future__ import annotations
+
+import logging
+import threading
+from typing import Callable, Tuple
+
+
+class QueryCancelled(Exception):
+    """ Raised inside a query job when a newer query superseded it """
+
+
+class QueryToken:
+    """ Generation token of a query job, tells the job if it was superseded """
+
+    generation: int
+    _runner: QueryRunner
+
+    def __init__(self, runner: QueryRunner, generation: int) -> None:
+        super().__init__()
+        self._runner = runner
+        self.generation = generation
+
+    def is_cancelled(self) -> bool:
+        """
+        Checks if a newer query was submitted
+        :return: Result of the check
+        """
+
+        return self._runner.generation != self.generation
+
+    def check(self) -> None:
+        """
+        Stops the job if a newer query was submitted
+        """
+
+        if self._runner.generation != self.generation:
+            raise QueryCancelled()
+
+
+# pylint: disable=too-few-public-methods
+class QueryRunner:
+    """
+    Runs query jobs one at a time in a worker thread.
+    Submitting a job cancels the running one at its next check and drops the queued one,
+    so only the newest query is run to completion.
+    """
+
+    generation: int
+    _logger: logging.Logger
+    _pending: Tuple[QueryToken, Callable[[QueryToken], None]] | None
+    _condition: threading.Condition
+    _thread: threading.Thread | None
+
+    def __init__(self, logger: logging.Logger) -> None:
+        super().__init__()
+        self.generation = 0
+        self._logger = logger
+        self._pending = None
+        self._condition = threading.Condition()
+        self._thread = None
+
+    def submit(self, job: Callable[[QueryToken], None]) -> QueryToken:
+        """
+        Schedules the job, superseding all previously submitted jobs
+        :param job: Function running the query, it should call `token.check()` between its stages
+        :return: Token of the job
+        """
+
+        with self._condition:
+            self.generation += 1
+            token = QueryToken(self, self.generation)
+            self._pending = (token, job)
+            self._condition.notify()
+
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name=self.__class__.__name__,
+                                                daemon=True)
+                self._thread.start()
+
+        return token
+
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                while self._pending is None:
+                    self._condition.wait()
+
+                token, job = self._pending
+                self._pending = None
+
+            try:
+                job(token)
+            except QueryCancelled:
+                self._logger.debug("Query %d was superseded", token.generation)
+            except Exception:  # pylint: disable=broad-except
+                self._logger.exception("Query %d failed", token.generation)
@@ -0,0 +1,215 @@
+""" Contains local socket service answering project queries of other desktop tools """
+from __future__ import annotations
+
+import json
+import logging
+import os
+import socket
+import socketserver
+import stat
+import threading
+from typing import Any, Callable, Dict
+
+MAX_CONNECTIONS = 4
+MAX_REQUEST_SIZE = 64 * 1024
+# Idle connections are closed after this many seconds, so they don't hold the connection slots
+CONNECTION_TIMEOUT = 10.0
+
+Handler = Callable[[Dict[str, Any]], Dict[str, Any]]
+
+
+class QueryRequestHandler(socketserver.StreamRequestHandler):
+    """
+    Reads newline-delimited JSON requests of a single connection
+    and writes a response line for each
+    """
+
+    server: QueryServer
+    timeout = CONNECTION_TIMEOUT
+
+    def handle(self) -> None:
+        service = self.server.service
+
+        if not service.acquire():
+            self.write({"error": "Too many connections"})
+            return
+
+        try:
+            while True:
+                line = self.rfile.readline(MAX_REQUEST_SIZE + 1)
+                if not line:
+                    return
+
+                if len(line) > MAX_REQUEST_SIZE:
+                    self.write({"error": "Request too large"})
+                    return
+
+                if line.strip():
+                    self.write(service.answer(line))
+        except (BrokenPipeError, ConnectionResetError, socket.timeout):
+            pass
+        finally:
+            service.release()
+
+    def write(self, response: Dict[str, Any]) -> None:
+        """
+        Writes the response as a single line
+        :param response: JSON serializable response
+        """
+
+        self.wfile.write(json.dumps(response, separators=(",", ":")).encode("utf8") + b"\n")
+        self.wfile.flush()
+
+
+class QueryServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """ Unix stream server handling each connection in its own daemon thread """
+
+    daemon_threads = True
+    service: QueryService
+
+    def __init__(self, path: str, service: QueryService) -> None:
+        super().__init__(path, QueryRequestHandler)
+        self.service = service
+
+
+class QueryService:
+    """
+    Listens on a Unix domain socket for newline-delimited JSON queries and answers them
+    with the handler. Connections above the limit are refused with an error response.
+    """
+
+    path: str
+    _handler: Handler
+    _logger: logging.Logger
+    _connections: threading.BoundedSemaphore
+    _server: QueryServer | None
+    _lock: threading.Lock
+
+    def __init__(self, handler: Handler, logger: logging.Logger, path: str | None = None,
+                 max_connections: int = MAX_CONNECTIONS) -> None:
+        super().__init__()
+        self.path = path if path is not None else QueryService.get_default_path()
+        self._handler = handler
+        self._logger = logger
+        self._connections = threading.BoundedSemaphore(max_connections)
+        self._server = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def get_default_path() -> str:
+        """
+        Gets the default socket location, inside the user runtime directory when available
+        :return: Path to the socket
+        """
+
+        runtime_dir = os.environ.get("XDG_RUNTIME_DIR")
+        if runtime_dir:
+            return os.path.join(runtime_dir, "ulauncher-jetbrains-reloaded.sock")
+
+        cache_home = os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache")
+        return os.path.join(cache_home, "ulauncher-jetbrains-reloaded", "query.sock")
+
+    def is_running(self) -> bool:
+        """
+        Checks if the service is listening
+        :return: Result of the check
+        """
+
+        return self._server is not None
+
+    def start(self) -> None:
+        """
+        Starts listening in a background thread,
+        a stale socket left by a previous process is replaced
+        """
+
+        with self._lock:
+            if self._server is not None:
+                return
+
+            try:
+                os.makedirs(os.path.dirname(self.path), mode=0o700, exist_ok=True)
+                self._remove_stale_socket()
+                server = QueryServer(self.path, self)
+                os.chmod(self.path, 0o600)
+            except OSError as error:
+                self._logger.warning("Unable to start query service on %s: %s", self.path, error)
+                return
+
+            self._server = server
+            threading.Thread(target=server.serve_forever, name=self.__class__.__name__,
+                             daemon=True).start()
+            self._logger.info("Query service listening on %s", self.path)
+
+    def stop(self) -> None:
+        """
+        Stops listening and removes the socket, connections in progress are finished
+        """
+
+        with self._lock:
+            server, self._server = self._server, None
+            if server is None:
+                return
+
+            server.shutdown()
+            server.server_close()
+
+            try:
+                os.unlink(self.path)
+            except OSError:
+                pass
+
+    def acquire(self) -> bool:
+        """
+        Reserves a connection slot
+        :return: False if all slots are taken
+        """
+
+        return self._connections.acquire(blocking=False)
+
+    def release(self) -> None:
+        """
+        Frees a connection slot
+        """
+
+        self._connections.release()
+
+    def answer(self, line: bytes) -> Dict[str, Any]:
+        """
+        Answers a single request,
+        failures are reported in the response instead of closing the connection
+        :param line: Request encoded as a JSON object
+        :return: Response of the handler or an error response
+        """
+
+        try:
+            request = json.loads(line)
+        except ValueError as error:
+            return {"error": f"Invalid JSON: {error}"}
+
+        if not isinstance(request, dict):
+            return {"error": "Request must be a JSON object"}
+
+        try:
+            return self._handler(request)
+        except ValueError as error:
+            return {"error": str(error)}
+        except Exception as error:  # pylint: disable=broad-except
+            self._logger.exception("Query service request failed")
+            return {"error": str(error)}
+
+    def _remove_stale_socket(self) -> None:
+        try:
+            if not stat.S_ISSOCK(os.lstat(self.path).st_mode):
+                raise OSError(f"{self.path} exists and is not a socket")
+        except FileNotFoundError:
+            return
+
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+            try:
+                client.connect(self.path)
+            except ConnectionRefusedError:
+                os.unlink(self.path)
+                return
+
+        raise OSError(f"{self.path} is used by another process")
@@ -1,110 +1,276 @@
 """ Contains parser for JetBrains IDEs "Recent projects" files """
+from __future__ import annotations
 
-import glob
 import os
-from typing import Optional, cast, List, TypedDict
+import stat
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple, cast, List, TypedDict
 from xml.etree import ElementTree
-from xml.etree.ElementTree import Element
 
 from data.IdeKey import IdeKey
 from data.IdeProject import IdeProject
 
 EntryData = TypedDict("EntryData", {"path": str, "timestamp": Optional[int]})
 
-TIMESTAMP_XML_PATH = 'value/RecentProjectMetaInfo/option[@name="projectOpenTimestamp"]'
+Fingerprint = Tuple[int, int, int]
+
+RECENT_PROJECTS_MANAGERS = [
+    "RecentProjectsManager",
+    "RecentDirectoryProjectsManager",
+    "RiderRecentProjectsManager",
+    "RiderRecentDirectoryProjectsManager"
+]
+ADDITIONAL_INFO_PATH = (("option", "additionalInfo"), ("map", None), ("entry", None))
+RECENT_PROJECTS_PATHS = [
+    (("option", "recentPaths"), ("list", None), ("option", None)),
+    ADDITIONAL_INFO_PATH,
+    (("option", "groups"), ("list", None), ("ProjectGroup", None), ("option", "projects"),
+     ("list", None), ("option", None))
+]
+TIMESTAMP_PATH = (
+    ("value", None), ("RecentProjectMetaInfo", None), ("option", "projectOpenTimestamp")
+)
+CACHE_SIZE = 128
 
 
 # pylint: disable=too-few-public-methods
 class RecentProjectsParser:
     """ Parser for JetBrains IDEs "Recent projects" files """
 
+    cache_size = CACHE_SIZE
+    _cache: "OrderedDict[Tuple[str, IdeKey], Tuple[Fingerprint, List[IdeProject]]]" = OrderedDict()
+    _cache_lock = threading.Lock()
+
     @staticmethod
-    def scan_paths(root: Element) -> List[Element]:
+    def fingerprint(file_path: str) -> Fingerprint | None:
         """
-        Find all elements from paths
-        :param root: Root element of the XML file
-        :return: Found elements
+        Gets the fingerprint of a file used to detect changes to it
+        :param file_path: The path to the file
+        :return: Tuple of modification time, size and inode or None if the file doesn't exist
         """
 
-        raw_projects = []
-        paths = [
-            './/component[@name="RecentProjectsManager"][1]',
-            './/component[@name="RecentDirectoryProjectsManager"][1]',
-            './/component[@name="RiderRecentProjectsManager"][1]',
-            './/component[@name="RiderRecentDirectoryProjectsManager"][1]'
-        ]
+        try:
+            result = os.stat(file_path)
+        except OSError:
+            return None
+
+        if not stat.S_ISREG(result.st_mode):
+            return None
+
+        return result.st_mtime_ns, result.st_size, result.st_ino
+
+    @staticmethod
+    def reserve(files: int) -> None:
+        """
+        Grows the cache to hold at least the specified number of files,
+        so files read on every reload don't evict each other
+        :param files: Number of files
+        """
+
+        RecentProjectsParser.cache_size = max(CACHE_SIZE, files)
+
+    @staticmethod
+    def clear_cache() -> None:
+        """
+        Removes all cached parse results
+        """
+
+        with RecentProjectsParser._cache_lock:
+            RecentProjectsParser._cache.clear()
+
+    @staticmethod
+    def export_cache() -> List[Dict]:
+        """
+        Exports cached parse results in a JSON serializable form
+        :return: Cached files with their fingerprints and entries
+        """
 
-        for path in paths:
-            raw_projects += \
-                root.findall(f'{path}/option[@name="recentPaths"]/list/option') + \
-                root.findall(f'{path}/option[@name="additionalInfo"]/map/entry') + \
-                root.findall(
-                    f'{path}/option[@name="groups"]/list/ProjectGroup/' +
-                    'option[@name="projects"]/list/option'
+        with RecentProjectsParser._cache_lock:
+            return [
+                {
+                    "file": file_path,
+                    "ide": ide_key,
+                    "fingerprint": list(fingerprint),
+                    "entries": [[project.path, project.timestamp] for project in projects]
+                }
+                for (file_path, ide_key), (fingerprint, projects)
+                in RecentProjectsParser._cache.items()
+            ]
+
+    @staticmethod
+    def restore_cache(files: List[Dict]) -> None:
+        """
+        Fills the cache with parse results exported by `export_cache`
+        :param files: Exported files
+        """
+
+        with RecentProjectsParser._cache_lock:
+            for data in files[-RecentProjectsParser.cache_size:]:
+                ide_key = cast(IdeKey, data["ide"])
+                RecentProjectsParser._cache[(data["file"], ide_key)] = (
+                    cast(Fingerprint, tuple(data["fingerprint"])),
+                    [
+                        IdeProject(name=os.path.basename(path), ide=ide_key, path=path,
+                                   timestamp=timestamp)
+                        for path, timestamp in data["entries"]
+                    ]
                 )
 
-        return raw_projects
+    # The streaming pass keeps its whole state in locals, splitting it would cost a call per element
+    # pylint: disable=too-many-locals,too-many-branches
+    @staticmethod
+    def scan_entries(file_path: str) -> List[EntryData]:
+        """
+        Reads project entries from the file in a single streaming pass.
+        Entries are returned in the order of the RecentProjectsManager components listed in
+        `RECENT_PROJECTS_MANAGERS` and then of the `RECENT_PROJECTS_PATHS`,
+        without duplicated paths.
+        :param file_path: The path to the file
+        :return: Found entries
+        """
+
+        buckets: Dict[Tuple[int, int], List[EntryData]] = {}
+        stack: List[List] = []  # [tag, name attribute, has component child]
+        component: int | None = None
+        manager = 0
+        timestamp: int | None = None
+
+        for event, element in ElementTree.iterparse(file_path, events=("start", "end")):
+            if event == "start":
+                if element.tag == "component" and len(stack) > 0:
+                    name = element.attrib.get("name")
+
+                    # Mimics `.//component[@name="..."][1]`,
+                    # only the first component of a parent counts
+                    if component is None and not stack[-1][2] and \
+                            name in RECENT_PROJECTS_MANAGERS:
+                        component = len(stack)
+                        manager = RECENT_PROJECTS_MANAGERS.index(cast(str, name))
+
+                    stack[-1][2] = True
+
+                stack.append([element.tag, element.attrib.get("name"), False])
+                continue
+
+            if component is not None:
+                relative = stack[component + 1:]
+
+                if timestamp is None and RecentProjectsParser.matches(
+                        relative, ADDITIONAL_INFO_PATH + TIMESTAMP_PATH):
+                    timestamp = int(element.attrib["value"])
+
+                for index, pattern in enumerate(RECENT_PROJECTS_PATHS):
+                    if RecentProjectsParser.matches(relative, pattern):
+                        buckets.setdefault((manager, index), []).append({
+                            "path": element.attrib["value" if "value" in element.attrib else "key"]
+                            .replace("$USER_HOME$", "~"),
+                            "timestamp": timestamp if pattern is ADDITIONAL_INFO_PATH else None
+                        })
+                        timestamp = None
+                        break
+
+                if len(stack) - 1 == component:
+                    component = None
+
+            element.clear()
+            stack.pop()
+
+        entries: Dict[str, EntryData] = {}
+        for key in sorted(buckets):
+            for data in buckets[key]:
+                existing = entries.get(data["path"])
+
+                if existing is None:
+                    entries[data["path"]] = data
+                elif data["timestamp"] is not None:
+                    existing["timestamp"] = data["timestamp"]
+
+        return list(entries.values())
+
+    @staticmethod
+    def matches(stack: List[List], pattern: Tuple[Tuple[str, str | None], ...]) -> bool:
+        """
+        Checks if the element stack matches the path pattern
+        :param stack: Elements from the component (excluded) down to the current element
+        :param pattern: Tuples of tag and name attribute (None matches any name)
+        :return: Result of the check
+        """
+
+        if len(stack) != len(pattern):
+            return False
+
+        return all(
+            frame[0] == tag and (name is None or frame[1] == name)
+            for frame, (tag, name) in zip(stack, pattern)
+        )
 
     @staticmethod
     def parse(file_path: str, ide_key: IdeKey) -> List[IdeProject]:
         """
-        Parses the "Recent projects" file
+        Parses the "Recent projects" file, reusing the previous result if the file didn't change
         :param file_path: The path to the file
         :param ide_key: IDE key identified with the file
         :return: Parsed projects
         """
 
-        if not os.path.isfile(file_path):
-            return []
-
-        root = ElementTree.parse(file_path).getroot()
-        raw_projects = RecentProjectsParser.scan_paths(root)
+        cache = RecentProjectsParser._cache
+        cache_key = (file_path, ide_key)
+        fingerprint = RecentProjectsParser.fingerprint(file_path)
 
-        projects: List[EntryData] = [
-            cast(
-                EntryData,
-                {
-                    "path": (
-                        project.attrib['value' if 'value' in project.attrib else 'key'])
-                        .replace("$USER_HOME$", "~"),
-                    "timestamp": (
-                        int(cast(Element, project.find(TIMESTAMP_XML_PATH)).attrib["value"])
-                        if project.find(TIMESTAMP_XML_PATH) is not None else None
-                    ) if project.tag == "entry" else None
-                }
-            ) for project in raw_projects
-        ]
+        with RecentProjectsParser._cache_lock:
+            if fingerprint is None:
+                cache.pop(cache_key, None)
+                return []
 
-        filtered: List[EntryData] = []
-        for project in projects:
-            index = next(
-                (index for index, d in enumerate(filtered) if d["path"] == project["path"]),
-                None
-            )
+            cached = cache.get(cache_key)
+            if cached is not None and cached[0] == fingerprint:
+                cache.move_to_end(cache_key)
+                return list(cached[1])
 
-            if index is None:
-                filtered.append(project)
-            elif index is not None and project["timestamp"] is not None:
-                filtered[index]["timestamp"] = project["timestamp"]
+        projects = RecentProjectsParser.parse_file(file_path, ide_key)
 
-        output = []
-        for data in filtered:
-            full_path = os.path.expanduser(data["path"])
-            name_file = full_path + '/.idea/.name'
-            name = ''
+        with RecentProjectsParser._cache_lock:
+            cache[cache_key] = (fingerprint, projects)
+            cache.move_to_end(cache_key)
+            while len(cache) > RecentProjectsParser.cache_size:
+                cache.popitem(last=False)
 
-            if os.path.exists(name_file):
-                with open(name_file, 'r', encoding="utf8") as file:
-                    name = file.read().replace('\n', '')
+        return list(projects)
 
-            icons = glob.glob(os.path.join(full_path, '.idea', 'icon.*'))
+    @staticmethod
+    def parse_file(file_path: str, ide_key: IdeKey) -> List[IdeProject]:
+        """
+        Parses the "Recent projects" file without using the cache
+        :param file_path: The path to the file
+        :param ide_key: IDE key identified with the file
+        :return: Parsed projects
+        """
 
-            output.append(IdeProject(
-                name=name or os.path.basename(data["path"]),
+        return [
+            IdeProject(
+                name=os.path.basename(data["path"]),
                 ide=ide_key,
                 path=data["path"],
-                timestamp=data["timestamp"],
-                icon=cast(Optional[str], icons[0] if len(icons) > 0 else None),
-            ))
+                timestamp=data["timestamp"]
+            ) for data in RecentProjectsParser.scan_entries(file_path)
+        ]
+
+    @staticmethod
+    def merge_histories(histories: List[List[IdeProject]]) -> List[IdeProject]:
+        """
+        Merges recent projects parsed from files of multiple IDE versions
+        :param histories: Parsed projects of each version, newest version first
+        :return: Projects without duplicated paths, each with its most recent timestamp
+        """
+
+        merged: Dict[str, IdeProject] = {}
+
+        for projects in histories:
+            for project in projects:
+                current = merged.get(project.path)
+
+                if current is None or (project.timestamp or 0) > (current.timestamp or 0):
+                    merged[project.path] = project
 
-        return output
+        return list(merged.values())
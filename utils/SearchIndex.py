@@ -0,0 +1,192 @@
+""" Contains search index used to skip projects that can't match a query """
+from __future__ import annotations
+
+from array import array
+from collections import Counter
+from typing import Callable, Dict, List, Tuple
+
+from data.IdeProject import IdeProject
+from utils.ProjectsList import ProjectsList, recency_key
+
+EMPTY: Tuple[array, array, array] = (array("I"), array("H"), array("H"))
+SCORING_CHUNK = 256
+
+
+# pylint: disable=too-many-instance-attributes
+class SearchIndex:
+    """
+    Precomputed lowercase forms and character postings of project names and paths.
+
+    Fuzzy score of a text is at most `100 * matched / len(query)`, where `matched` can't exceed
+    the number of query characters (with repetitions) found in the text. The postings give that
+    number for every project at once, so projects that can't reach the minimal score are skipped
+    before any fuzzy scoring runs. The rest is scored from the highest possible score down,
+    until no remaining project can beat the worst selected one.
+    Projects are also kept presorted by recency to answer empty queries without sorting.
+    Postings and per-query match counts are stored in compact arrays, as the index of a large
+    history is kept for the whole session.
+    """
+
+    _projects: List[IdeProject]
+    _recent: List[IdeProject]
+    _names: List[str]
+    _paths: List[str]
+    _name_lengths: array
+    _path_lengths: array
+    # Project indexes, name and path character counts
+    _postings: Dict[str, Tuple[array, array, array]]
+    _last: Tuple[Counter, array, array] | None
+
+    def __init__(self, projects: List[IdeProject]) -> None:
+        super().__init__()
+        self._projects = list(projects)
+        self._recent = sorted(self._projects, key=recency_key)
+        self._names = []
+        self._paths = []
+        self._name_lengths = array("H")
+        self._path_lengths = array("H")
+        self._postings = {}
+        self._last = None
+
+        for index, project in enumerate(self._projects):
+            name = project.name.lower()
+            path = project.path.lower()
+            # Lowercase forms equal to the original ones share its string
+            self._names.append(project.name if name == project.name else name)
+            self._paths.append(project.path if path == project.path else path)
+            # Longer texts get the bound of the longest stored length, which is higher
+            self._name_lengths.append(min(len(project.name), 0xFFFF))
+            self._path_lengths.append(min(len(project.path), 0xFFFF))
+
+            name_counts = Counter(name)
+            path_counts = Counter(path)
+
+            for char in name_counts.keys() | path_counts.keys():
+                postings = self._postings.get(char)
+                if postings is None:
+                    postings = self._postings[char] = (array("I"), array("H"), array("H"))
+
+                postings[0].append(index)
+                postings[1].append(min(name_counts[char], 0xFFFF))
+                postings[2].append(min(path_counts[char], 0xFFFF))
+
+    def __len__(self) -> int:
+        return len(self._projects)
+
+    def recent(self, limit: int) -> List[IdeProject]:
+        """
+        Gets the most recently opened projects
+        :param limit: Maximal number of projects
+        :return: Projects ordered from the most recent one
+        """
+
+        return self._recent[:limit]
+
+    # pylint: disable=too-many-locals
+    def select(self, query: str, min_score: float, limit: int,
+               check: Callable[[], None] | None = None) -> ProjectsList:
+        """
+        Selects projects which name or path scores best against the query.
+        Scores are equal to `get_score` from Ulauncher, so are the selected projects.
+        :param query: Search query
+        :param min_score: Minimal score
+        :param limit: Maximal number of projects
+        :param check: Called between chunks of scored projects, may raise to stop the selection
+        :return: Selected projects
+        """
+
+        projects = ProjectsList(query, min_score=min_score, limit=limit)
+        query = query.lower().strip()
+        if not query:
+            projects.extend(self._projects)
+            return projects
+
+        scorer = projects.scorer
+        name_matches, path_matches = self._count_matches(Counter(query))
+        required = min_score * len(query)
+        factors = scorer.get_bound_factors(
+            max(max(self._name_lengths, default=0), max(self._path_lengths, default=0))
+        )
+
+        candidates = []
+        for index, name_matched, path_matched, name_length, path_length in zip(
+                range(len(self._projects)), name_matches, path_matches, self._name_lengths,
+                self._path_lengths):
+            if name_matched * 100 < required and path_matched * 100 < required:
+                continue
+
+            name_bound = name_matched * factors[name_length]
+            path_bound = path_matched * factors[path_length]
+            bound = name_bound if name_bound > path_bound else path_bound
+            if bound >= min_score:
+                candidates.append((-bound, index, name_bound, path_bound))
+
+        # Highest possible scores go first, equal ones keep the indexed order
+        candidates.sort()
+
+        for count, (neg_bound, index, name_bound, path_bound) in enumerate(candidates):
+            if check is not None and count % SCORING_CHUNK == 0:
+                check()
+
+            threshold = projects.threshold
+            if threshold is not None and -neg_bound < threshold:
+                break
+
+            project = self._projects[index]
+            if name_bound >= path_bound:
+                score = scorer.score(project.name, self._names[index])
+                if path_bound > score:
+                    score = max(score, scorer.score(project.path, self._paths[index]))
+            else:
+                score = scorer.score(project.path, self._paths[index])
+                if name_bound > score:
+                    score = max(score, scorer.score(project.name, self._names[index]))
+
+            projects.insert(score, project, index)
+
+        return projects
+
+    def _count_matches(self, counts: Counter) -> Tuple[array, array]:
+        """
+        Counts query characters found in names and paths of the projects.
+        Counts of the previous query are updated when it differs by fewer characters than the new
+        query has, which makes typing the next character cost only the postings of that character.
+        :param counts: Counts of the query characters
+        :return: Matched characters of each project name and path
+        """
+
+        previous = self._last
+        if previous is not None:
+            changed = [
+                char for char in counts.keys() | previous[0].keys()
+                if counts[char] != previous[0][char]
+            ]
+
+            if len(changed) < len(counts):
+                _, name_matches, path_matches = previous
+
+                for char in changed:
+                    old_count, new_count = previous[0][char], counts[char]
+
+                    for index, name_count, path_count in zip(*self._postings.get(char, EMPTY)):
+                        name_matches[index] += \
+                            (name_count if name_count < new_count else new_count) - \
+                            (name_count if name_count < old_count else old_count)
+                        path_matches[index] += \
+                            (path_count if path_count < new_count else new_count) - \
+                            (path_count if path_count < old_count else old_count)
+
+                self._last = (counts, name_matches, path_matches)
+                return name_matches, path_matches
+
+        name_matches = array("I", bytes(4 * len(self._projects)))
+        path_matches = array("I", bytes(4 * len(self._projects)))
+
+        for char, count in counts.items():
+            for index, name_count, path_count in zip(*self._postings.get(char, EMPTY)):
+                # Conditional expressions instead of min(), this loop runs for every posting
+                name_matches[index] += name_count if name_count < count else count
+                path_matches[index] += path_count if path_count < count else count
+
+        self._last = (counts, name_matches, path_matches)
+        return name_matches, path_matches
@@ -0,0 +1,93 @@
+""" Contains on-disk snapshot of the cached extension state """
+from __future__ import annotations
+
+import json
+import os
+import threading
+from typing import Any, Callable, Dict
+
+SNAPSHOT_VERSION = 1
+SNAPSHOT_DELAY = 5.0
+
+
+class Snapshot:
+    """
+    Stores cached state in a versioned JSON file inside the user cache directory,
+    so a newly started extension process can skip the work done by the previous one.
+    Every cached entry keeps the fingerprint of its source, so outdated entries are
+    dropped by the regular cache checks after the snapshot is restored.
+    """
+
+    path: str
+    _collect: Callable[[], Dict[str, Any]]
+    _timer: threading.Timer | None
+    _lock: threading.Lock
+
+    def __init__(self, collect: Callable[[], Dict[str, Any]], path: str | None = None) -> None:
+        super().__init__()
+        self.path = path if path is not None else Snapshot.get_default_path()
+        self._collect = collect
+        self._timer = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def get_default_path() -> str:
+        """
+        Gets the default snapshot location
+        :return: Path to the snapshot file
+        """
+
+        cache_home = os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache")
+        return os.path.join(cache_home, "ulauncher-jetbrains-reloaded", "snapshot.json")
+
+    def load(self) -> Dict[str, Any] | None:
+        """
+        Reads the snapshot
+        :return: Snapshot data or None if it doesn't exist, is invalid or has a different version
+        """
+
+        try:
+            with open(self.path, "r", encoding="utf8") as file:
+                data = json.load(file)
+        except (OSError, ValueError):
+            return None
+
+        if not isinstance(data, dict) or data.get("version") != SNAPSHOT_VERSION:
+            return None
+
+        return data
+
+    def save(self) -> None:
+        """
+        Writes the current state to the snapshot, replacing it atomically
+        """
+
+        with self._lock:
+            self._timer = None
+            data = dict(self._collect(), version=SNAPSHOT_VERSION)
+            temp_path = f"{self.path}.{os.getpid()}.tmp"
+
+            try:
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+                with open(temp_path, "w", encoding="utf8") as file:
+                    json.dump(data, file, separators=(",", ":"))
+                os.replace(temp_path, self.path)
+            except OSError:
+                try:
+                    os.remove(temp_path)
+                except OSError:
+                    pass
+
+    def schedule(self, delay: float = SNAPSHOT_DELAY) -> None:
+        """
+        Saves the snapshot after a delay, changes made meanwhile are saved together
+        :param delay: Delay in seconds
+        """
+
+        with self._lock:
+            if self._timer is not None:
+                return
+
+            self._timer = threading.Timer(delay, self.save)
+            self._timer.daemon = True
+            self._timer.start()
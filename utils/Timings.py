@@ -0,0 +1,109 @@
+""" Contains timer used to find out which query stages are slow """
+from __future__ import annotations
+
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from typing import ContextManager, Dict, Iterator, Tuple
+
+STAGES = ["args", "launchers", "config", "parse", "metadata", "scoring", "sorting", "render"]
+
+
+class Timings:
+    """ Accumulates durations of query stages, in total and for each IDE """
+
+    enabled: bool
+    _started: float
+    _totals: Dict[str, float]
+    _per_ide: Dict[str, Dict[str, float]]
+    _lock: threading.Lock
+
+    def __init__(self, enabled: bool = True) -> None:
+        super().__init__()
+        self.enabled = enabled
+        self._started = time.perf_counter()
+        self._totals = {}
+        self._per_ide = {}
+        self._lock = threading.Lock()
+
+    def measure(self, stage: str, ide_key: str | None = None) -> ContextManager:
+        """
+        Measures duration of the stage, does nothing when timings are disabled
+        :param stage: Stage name
+        :param ide_key: IDE key the stage is performed for
+        :return: Context manager measuring the stage
+        """
+
+        if not self.enabled:
+            return nullcontext()
+
+        return self._measure(stage, ide_key)
+
+    @contextmanager
+    def _measure(self, stage: str, ide_key: str | None) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(stage, time.perf_counter() - start, ide_key)
+
+    def add(self, stage: str, duration: float, ide_key: str | None = None) -> None:
+        """
+        Adds duration to the stage
+        :param stage: Stage name
+        :param duration: Duration in seconds
+        :param ide_key: IDE key the stage was performed for
+        """
+
+        with self._lock:
+            self._totals[stage] = self._totals.get(stage, 0) + duration
+
+            if ide_key is not None:
+                ide_timings = self._per_ide.setdefault(ide_key, {})
+                ide_timings[stage] = ide_timings.get(stage, 0) + duration
+
+    def total(self) -> float:
+        """
+        Gets time elapsed since the timings were created
+        :return: Duration in seconds
+        """
+
+        return time.perf_counter() - self._started
+
+    def stages(self) -> Dict[str, float]:
+        """
+        Gets total durations of the measured stages
+        :return: Durations in seconds for each stage
+        """
+
+        with self._lock:
+            return dict(self._totals)
+
+    def breakdown(self) -> Tuple[str, str]:
+        """
+        Formats the measured durations
+        :return: Tuple of totals for each stage and totals for each IDE
+        """
+
+        with self._lock:
+            stages = " ".join(
+                f"{stage}={self._totals[stage] * 1000:.2f}ms"
+                for stage in STAGES if stage in self._totals
+            )
+            ides = " ".join(
+                f"{ide_key}[" + ",".join(
+                    f"{stage}={timings[stage] * 1000:.2f}ms" for stage in STAGES if stage in timings
+                ) + "]"
+                for ide_key, timings in self._per_ide.items()
+            )
+
+        return stages, ides
+
+    def summary(self) -> str:
+        """
+        Formats the measured durations as a single line
+        :return: Summary of the timings
+        """
+
+        stages, ides = self.breakdown()
+        return f"total={self.total() * 1000:.2f}ms {stages}" + (f" ides: {ides}" if ides else "")
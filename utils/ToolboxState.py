@@ -0,0 +1,141 @@
+""" Contains reader of the JetBrains Toolbox state file """
+from __future__ import annotations
+
+import json
+import os
+import re
+import stat
+import threading
+from typing import Dict, Tuple
+
+from data.IdeKey import IdeKey
+from data.ToolboxTool import ToolboxTool
+
+# Product codes of the tools installed by the Toolbox app
+TOOLBOX_PRODUCTS: Dict[str, IdeKey] = {
+    "CL": "clion",
+    "IU": "idea",
+    "IC": "idea",
+    "PS": "phpstorm",
+    "PC": "pycharm",
+    "PY": "pycharm",
+    "RD": "rider",
+    "WS": "webstorm",
+    "GO": "goland",
+    "DG": "datagrip",
+    "RM": "rubymine",
+    "AI": "android-studio",
+    "RR": "rustrover"
+}
+VERSION_PATTERN = re.compile(r"\d+")
+
+Fingerprint = Tuple[int, int, int]
+
+
+class ToolboxState:
+    """
+    Finds IDEs installed by the JetBrains Toolbox app using its state file,
+    the file is read again only when it changes.
+    """
+
+    path: str
+    _cached: Tuple[Fingerprint, Dict[IdeKey, ToolboxTool]] | None
+    _lock: threading.Lock
+
+    def __init__(self, path: str | None = None) -> None:
+        super().__init__()
+        self.path = path if path is not None else ToolboxState.get_default_path()
+        self._cached = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def get_default_path() -> str:
+        """
+        Gets the default state file location
+        :return: Path to the state file
+        """
+
+        data_home = os.environ.get("XDG_DATA_HOME") or os.path.expanduser("~/.local/share")
+        return os.path.join(data_home, "JetBrains", "Toolbox", "state.json")
+
+    @staticmethod
+    def parse_version(version: str) -> Tuple[int, ...]:
+        """
+        Parses the tool version, e.g. "2023.2.1" or "232.9559.62"
+        :param version: Version string
+        :return: Version numbers
+        """
+
+        return tuple(int(number) for number in VERSION_PATTERN.findall(version))
+
+    @staticmethod
+    def parse(file_path: str) -> Dict[IdeKey, ToolboxTool]:
+        """
+        Reads installed IDEs from the state file, the newest one is kept when an IDE is installed
+        multiple times, e.g. from different channels or editions
+        :param file_path: Path to the state file
+        :raise ValueError: If the file isn't a valid state file
+        :return: Installed IDEs
+        """
+
+        with open(file_path, "r", encoding="utf8") as file:
+            data = json.load(file)
+
+        if not isinstance(data, dict) or not isinstance(data.get("tools"), list):
+            raise ValueError("Missing tools list")
+
+        tools: Dict[IdeKey, ToolboxTool] = {}
+
+        for tool in data["tools"]:
+            if not isinstance(tool, dict):
+                continue
+
+            ide_key = TOOLBOX_PRODUCTS.get(str(tool.get("productCode")))
+            install_location = tool.get("installLocation")
+            launch_command = tool.get("launchCommand")
+            if ide_key is None or not isinstance(install_location, str) or \
+                    not isinstance(launch_command, str) or not launch_command:
+                continue
+
+            version = ToolboxState.parse_version(
+                str(tool.get("displayVersion") or tool.get("buildNumber") or "")
+            )
+            if ide_key in tools and tools[ide_key].version >= version:
+                continue
+
+            tools[ide_key] = ToolboxTool(
+                ide_key=ide_key,
+                launcher=os.path.join(install_location, launch_command),
+                version=version
+            )
+
+        return tools
+
+    def get_tools(self) -> Dict[IdeKey, ToolboxTool] | None:
+        """
+        Gets installed IDEs, cached until the state file changes
+        :return: Installed IDEs or None if the state file doesn't exist or can't be read
+        """
+
+        try:
+            result = os.stat(self.path)
+        except OSError:
+            return None
+
+        if not stat.S_ISREG(result.st_mode):
+            return None
+
+        fingerprint = (result.st_mtime_ns, result.st_size, result.st_ino)
+        cached = self._cached
+        if cached is not None and cached[0] == fingerprint:
+            return cached[1]
+
+        try:
+            tools = ToolboxState.parse(self.path)
+        except (OSError, ValueError):
+            return None
+
+        with self._lock:
+            self._cached = (fingerprint, tools)
+
+        return tools